@@ -0,0 +1,214 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from typing import Dict, Optional
+
+from backend.metrics import metrics
+
+# Lower runs first: short interactive calls ahead of long summarize jobs
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BATCH = 2
+MODE_PRIORITY = {
+    "qa": PRIORITY_INTERACTIVE,
+    "simplify": PRIORITY_INTERACTIVE,
+    "enhance-summary": PRIORITY_DEFAULT,
+    "risk-analysis": PRIORITY_DEFAULT,
+    "translate-hindi": PRIORITY_DEFAULT,
+    "summarize": PRIORITY_BATCH,
+}
+
+
+def _setting(name: str, provider: str, default: str) -> float:
+    """Per-provider override (ADMISSION_X_GEMINI_SDK) falling back to ADMISSION_X"""
+    suffix = provider.upper().replace("-", "_")
+    return float(os.getenv(f"{name}_{suffix}", os.getenv(name, default)))
+
+
+class Overloaded(Exception):
+    """Raised instead of queueing work that would not start before its deadline"""
+
+    def __init__(self, provider: str, reason: str, retry_after: float):
+        super().__init__(f"{provider} overloaded ({reason})")
+        self.provider = provider
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBudget:
+    """Token bucket refilled at tokens_per_minute, bursting up to one minute's worth"""
+
+    def __init__(self, tokens_per_minute: float):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = tokens_per_minute
+        self.updated = time.monotonic()
+
+    def wait_time(self, n: int, now: float) -> float:
+        """Seconds until n tokens are available (0 if they are now)"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        n = min(n, self.capacity)
+        return 0.0 if self.tokens >= n else (n - self.tokens) / self.rate
+
+    def take(self, n: int) -> None:
+        self.tokens -= min(n, self.capacity)
+
+
+class ProviderGate:
+    """Admission for one provider: a concurrency cap, a bounded priority
+    queue with per-call deadlines, and an optional token-per-minute budget.
+
+    Work that cannot start before its deadline is rejected up front (queue
+    full, or the expected wait from recent service times is too long)
+    rather than after a provider timeout.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, max_wait: float,
+                 tokens_per_minute: float = 0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.budget = TokenBudget(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.in_flight = 0
+        # Entries: [priority, seq, future, deadline, tokens]
+        self._waiters: list = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.service_time: Optional[float] = None
+        self.admitted = 0
+        self.shed = 0
+
+    def _expected_wait(self, priority: int) -> Optional[float]:
+        if self.service_time is None:
+            return None
+        ahead = sum(1 for w in self._waiters if w[0] <= priority and not w[2].done())
+        return (ahead + 1) / self.max_concurrency * self.service_time
+
+    def _reject(self, reason: str, retry_after: Optional[float] = None) -> Overloaded:
+        self.shed += 1
+        metrics.inc("admission_shed_total", provider=self.name, reason=reason)
+        return Overloaded(self.name, reason, max(1.0, round(retry_after or self.max_wait)))
+
+    def _budget_wait(self, tokens: int, now: float) -> float:
+        return self.budget.wait_time(tokens, now) if self.budget else 0.0
+
+    def _grant(self, tokens: int) -> None:
+        if self.budget:
+            self.budget.take(tokens)
+        self.in_flight += 1
+        self.admitted += 1
+
+    def _discard(self, entry: list) -> None:
+        # A waiter that timed out or was cancelled leaves the queue at once, so
+        # it no longer counts against max_queue or blocks the fast path
+        try:
+            self._waiters.remove(entry)
+        except ValueError:
+            return
+        heapq.heapify(self._waiters)
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        while self._waiters and self.in_flight < self.max_concurrency:
+            _, _, future, deadline, tokens = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            now = time.monotonic()
+            wait = self._budget_wait(tokens, now)
+            if wait > 0:
+                if now + wait > deadline:
+                    heapq.heappop(self._waiters)
+                    future.set_exception(self._reject("token budget", wait))
+                    continue
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self._grant(tokens)
+            future.set_result(None)
+
+    async def acquire(self, priority: int = PRIORITY_DEFAULT, tokens: int = 0) -> None:
+        now = time.monotonic()
+        if not self._waiters and self.in_flight < self.max_concurrency and self._budget_wait(tokens, now) == 0:
+            self._grant(tokens)
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue full", self._expected_wait(priority))
+        expected = self._expected_wait(priority)
+        if expected is not None and expected > self.max_wait:
+            raise self._reject("expected wait", expected)
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), future, now + self.max_wait, tokens]
+        heapq.heappush(self._waiters, entry)
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                self._discard(entry)
+                raise self._reject("deadline")
+        except asyncio.CancelledError:
+            # Caller went away while queued (client disconnect, lost hedge)
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release()
+            else:
+                future.cancel()
+                self._discard(entry)
+            raise
+        future.result()
+        metrics.observe("admission_wait_seconds", time.monotonic() - now, provider=self.name, priority=priority)
+
+    def release(self, elapsed: Optional[float] = None) -> None:
+        self.in_flight -= 1
+        if elapsed is not None:
+            self.service_time = elapsed if self.service_time is None else 0.8 * self.service_time + 0.2 * elapsed
+        self._dispatch()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": sum(1 for w in self._waiters if not w[2].done()),
+            "max_concurrency": self.max_concurrency,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "service_seconds": round(self.service_time, 3) if self.service_time is not None else None,
+        }
+
+
+class AdmissionController:
+    """Per-provider gates, created on first use from ADMISSION_* settings"""
+
+    def __init__(self, gates: Optional[Dict[str, ProviderGate]] = None):
+        self.gates: Dict[str, ProviderGate] = dict(gates or {})
+
+    def gate(self, provider: str) -> ProviderGate:
+        gate = self.gates.get(provider)
+        if gate is None:
+            gate = self.gates[provider] = ProviderGate(
+                provider,
+                max_concurrency=int(_setting("ADMISSION_MAX_CONCURRENCY", provider, "8")),
+                max_queue=int(_setting("ADMISSION_QUEUE_SIZE", provider, "64")),
+                max_wait=_setting("ADMISSION_MAX_WAIT", provider, "10"),
+                tokens_per_minute=_setting("ADMISSION_TOKENS_PER_MINUTE", provider, "0"),
+            )
+        return gate
+
+    async def acquire(self, provider: str, priority: int = PRIORITY_DEFAULT, tokens: int = 0) -> ProviderGate:
+        gate = self.gate(provider)
+        await gate.acquire(priority, tokens)
+        return gate
+
+    def stats(self, provider: str) -> Optional[dict]:
+        gate = self.gates.get(provider)
+        return gate.stats() if gate else None
+
+
+# Global instance
+admission = AdmissionController()
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Optional, Tuple
+
+from backend.admission import MODE_PRIORITY, PRIORITY_DEFAULT
+from backend.cache import doc_hash, result_cache
+from backend.extract import split_sections
+from backend.metrics import metrics, stage
+from backend.router import provider_router
+from backend.prompts import (
+    SUMMARIZE_PROMPT, SIMPLIFY_PROMPT, QA_PROMPT,
+    ENHANCE_SUMMARY_PROMPT, RISK_ANALYSIS_PROMPT, TRANSLATE_HINDI_PROMPT,
+)
+from backend.retrieval import index_registry, format_context
+from backend.summarize import needs_map_reduce, map_sections, reduce_prompt
+
+QA_TOP_K = int(os.getenv("QA_TOP_K", "4"))
+
+# Generation options per analysis mode
+MODE_OPTIONS = {
+    "summarize": {"temperature": 0.3, "num_predict": 512},
+    "simplify": {"temperature": 0.3, "num_predict": 400},
+    "qa": {"temperature": 0.2, "num_predict": 384},
+    "enhance-summary": {"num_predict": 512},
+    "risk-analysis": {"num_predict": 512},
+    "translate-hindi": {"num_predict": 512},
+}
+
+
+def text_generator(provider: Optional[str] = None, priority: int = PRIORITY_DEFAULT):
+    """prompt -> (text, model tag that answered) callable over the router, for multi-call pipelines"""
+    async def generate(prompt: str, options: Optional[dict] = None) -> Tuple[str, str]:
+        out, used = await provider_router.generate(prompt, options, prefer=provider, priority=priority)
+        return out, used.tag
+    return generate
+
+
+async def build_prompt(mode: str, text: str, question: Optional[str] = None,
+                       digest: Optional[str] = None, provider: Optional[str] = None) -> Tuple[str, bool]:
+    """(prompt, exact) for an analysis mode over text.
+
+    exact is False when part of the prompt was generated by a provider other
+    than the preferred one, so the result must not be cached under its key.
+    """
+    if mode == "summarize":
+        if needs_map_reduce(text):
+            # Long documents: summarize sections in parallel, then reduce
+            model = provider_router.model_tag(provider)
+            partials, served = await map_sections(split_sections(text),
+                                                  text_generator(provider, MODE_PRIORITY["summarize"]), model)
+            return reduce_prompt(partials), served <= {model}
+        return SUMMARIZE_PROMPT.format(content=text), True
+    if mode == "simplify":
+        return SIMPLIFY_PROMPT.format(content=text[:16000]), True
+    if mode == "qa":
+        q = question or ""
+        # Only the top-k sections relevant to the question go to the model;
+        # a missing index is built (and the text hashed) off the event loop
+        index = await asyncio.to_thread(index_registry.get_or_build, text, split_sections, digest)
+        return QA_PROMPT.format(content=format_context(index.search(q, k=QA_TOP_K)), question=q), True
+    if mode == "enhance-summary":
+        return ENHANCE_SUMMARY_PROMPT.format(content=text[:2000]), True
+    if mode == "risk-analysis":
+        return RISK_ANALYSIS_PROMPT.format(content=text[:3000]), True
+    if mode == "translate-hindi":
+        return TRANSLATE_HINDI_PROMPT.format(content=text[:1000]), True
+    raise ValueError(f"unsupported mode: {mode}")
+
+
+def cache_key(mode: str, text: str, question: Optional[str] = None, digest: Optional[str] = None,
+              provider: Optional[str] = None) -> str:
+    return result_cache.make_key(mode, text, question, MODE_OPTIONS[mode],
+                                 provider_router.model_tag(provider), digest=digest)
+
+
+async def run_analysis(mode: str, text: str, question: Optional[str] = None, digest: Optional[str] = None,
+                       provider: Optional[str] = None) -> Tuple[str, bool, str]:
+    """(result, cached, powered_by) for one analysis, going through the result cache"""
+    # Hash inline text once, off the event loop; the cache key and qa index both use it
+    digest = digest or await asyncio.to_thread(doc_hash, text)
+    key = cache_key(mode, text, question, digest, provider)
+    cached = await result_cache.get(key)
+    metrics.inc("analysis_cache_total", mode=mode, result="miss" if cached is None else "hit")
+    if cached is not None:
+        return cached, True, provider_router.label(provider)
+
+    started = time.perf_counter()
+    with stage("build_prompt"):
+        prompt, exact = await build_prompt(mode, text, question, digest, provider)
+    out, used = await provider_router.generate(prompt, MODE_OPTIONS[mode], prefer=provider,
+                                               priority=MODE_PRIORITY[mode])
+    # The key names the preferred provider; a fallback's answer (or one built on
+    # fallback map partials) must not be served under it
+    if exact and used is provider_router.preferred(provider):
+        await result_cache.set(key, out, cost_seconds=time.perf_counter() - started)
+    return out, False, used.label
+
+
+async def stream_analysis(mode: str, text: str, question: Optional[str] = None, digest: Optional[str] = None,
+                          provider: Optional[str] = None) -> AsyncIterator[Tuple[str, str]]:
+    """(delta, powered_by) pairs for one analysis; cache hits arrive as a single delta.
+
+    Closing the generator closes the upstream provider stream.
+    """
+    digest = digest or await asyncio.to_thread(doc_hash, text)
+    key = cache_key(mode, text, question, digest, provider)
+    cached = await result_cache.get(key)
+    metrics.inc("analysis_cache_total", mode=mode, result="miss" if cached is None else "hit")
+    if cached is not None:
+        yield cached, provider_router.label(provider)
+        return
+
+    parts = []
+    used = None
+    started = time.perf_counter()
+    with stage("build_prompt"):
+        prompt, exact = await build_prompt(mode, text, question, digest, provider)
+    stream = provider_router.stream(prompt, MODE_OPTIONS[mode], prefer=provider, priority=MODE_PRIORITY[mode])
+    try:
+        async for delta, used in stream:
+            parts.append(delta)
+            yield delta, used.label
+    finally:
+        await stream.aclose()
+    if exact and used is provider_router.preferred(provider):
+        await result_cache.set(key, "".join(parts).strip(), cost_seconds=time.perf_counter() - started)
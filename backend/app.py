@@ -1,23 +1,31 @@
 import os
+import json
+import asyncio
+import hashlib
+import tempfile
 from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import Optional, Literal
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional, Literal, Tuple
 from dotenv import load_dotenv
 from fastapi.exception_handlers import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
-# local imports (with backend prefix)
-from backend.extract import extract_text, split_sections, highlight_risks
-from backend.prompts import SUMMARIZE_PROMPT, SIMPLIFY_PROMPT, QA_PROMPT
-from backend.ollama_client import generate
-from backend.gemini_client import gemini_client
-
-
-# Load environment variables
+# Load environment variables before local modules read their settings
 load_dotenv(override=False)
 
+# local imports (with backend prefix)
+from backend.extract import extract_file, split_sections, scan_risks, first_occurrences, shutdown_pool
+from backend.cache import result_cache, doc_hash, text_hash
+from backend.retrieval import index_registry, SectionIndex
+from backend.docstore import document_store
+from backend.analysis import run_analysis, stream_analysis
+from backend.router import provider_router
+from backend.admission import Overloaded
+from backend.revisions import diff_sections, incremental_risk_hits, revision_overview, analyze_revision
+from backend.metrics import MetricsMiddleware, metrics, stage, current_profile, profile_summary
+
 app = FastAPI(title="Local Legal Assistant API")
 
 # ✅ CORS
@@ -27,8 +35,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Request latency, payload sizes and opt-in (X-Profile: 1) timing breakdowns
+app.add_middleware(MetricsMiddleware)
+
 # ✅ Custom error handlers
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
@@ -46,6 +58,15 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         headers={"Access-Control-Allow-Origin": "*"},
     )
 
+# Admission control shed the request: fail fast so clients back off
+@app.exception_handler(Overloaded)
+async def overloaded_exception_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": f"AI service busy: {exc}"},
+        headers={"Retry-After": str(int(exc.retry_after)), "Access-Control-Allow-Origin": "*"},
+    )
+
 @app.exception_handler(Exception)
 async def generic_exception_handler(request: Request, exc: Exception):
     return JSONResponse(
@@ -54,101 +75,323 @@ async def generic_exception_handler(request: Request, exc: Exception):
         headers={"Access-Control-Allow-Origin": "*"},
     )
 
+@app.on_event("shutdown")
+async def shutdown():
+    await provider_router.aclose()
+    shutdown_pool()
+
 # Health check
 @app.get("/health")
 async def health():
     return {"ok": True}
 
+# Result cache counters
+@app.get("/cache-stats")
+async def cache_stats():
+    return result_cache.stats()
+
+# Per-provider latency, error rate and breaker state
+@app.get("/provider-stats")
+async def provider_stats():
+    return provider_router.stats()
+
+# Prometheus scrape endpoint
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # Request models
+Provider = Literal["gemini", "ollama", "gemini-sdk"]
+
 class AnalyzeBody(BaseModel):
     mode: Literal["summarize", "simplify", "qa"]
     text: Optional[str] = None
+    doc_id: Optional[str] = None
     question: Optional[str] = None
+    provider: Optional[Provider] = None
 
 class SimpleBody(BaseModel):
-    text: str
+    text: Optional[str] = None
+    doc_id: Optional[str] = None
+    provider: Optional[Provider] = None
+
+class BatchTask(BaseModel):
+    mode: Literal["summarize", "simplify", "qa", "enhance-summary", "risk-analysis", "translate-hindi"]
+    id: Optional[str] = None
+    question: Optional[str] = None
+    text: Optional[str] = None
+
+class RevisionBody(BaseModel):
+    doc_id: str
+    previous_doc_id: str
+    provider: Optional[Provider] = None
+
+# Each batch task may become several provider calls; bound the fan-out per request
+BATCH_MAX_TASKS = int(os.getenv("BATCH_MAX_TASKS", "16"))
+
+class BatchBody(BaseModel):
+    text: Optional[str] = None
+    doc_id: Optional[str] = None
+    provider: Optional[Provider] = None
+    tasks: List[BatchTask] = Field(..., max_length=BATCH_MAX_TASKS)
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+async def spool_upload(file: UploadFile) -> Tuple[str, str]:
+    """Copy an upload to a temp file in chunks so it is never fully in memory.
+
+    Returns the temp path and the SHA-256 of the raw bytes.
+    """
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(file.filename or "")[1])
+    with os.fdopen(fd, "wb") as out:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            digest.update(chunk)
+            out.write(chunk)
+    return path, digest.hexdigest()
+
+
+def prepare_document(text: str, previous: Optional[dict] = None) -> dict:
+    """Sections, risk hits and section index for freshly extracted text (CPU-bound)"""
+    sections = split_sections(text)
+    diff = None
+    if previous:
+        diff = diff_sections(previous["text"], text)
+        risk_hits = incremental_risk_hits(previous["risk_hits"], text, diff)
+    else:
+        risk_hits = scan_risks(text)
+    with stage("index"):
+        index = SectionIndex(sections)
+    # Stored by exact text (hit offsets point into it); cached results go by the normalized digest
+    doc_id, digest = text_hash(text), doc_hash(text)
+    index_registry.put(digest, index)
+    return {"doc_id": doc_id, "digest": digest, "text": text, "sections": sections, "risk_hits": risk_hits,
+            "diff": diff}
+
+
+async def load_document(file: UploadFile, previous: Optional[dict] = None) -> dict:
+    """Stored document for an upload, extracting and indexing it only if new.
+
+    With a previous version, the result carries a section diff against it
+    and only changed sections are rescanned for risks.
+    """
+    path, file_hash = await spool_upload(file)
+    try:
+        doc_id = await asyncio.to_thread(document_store.lookup_file, file_hash)
+        if doc_id:
+            doc = await asyncio.to_thread(document_store.get, doc_id)
+            if doc is not None:
+                if previous:
+                    doc["diff"] = await asyncio.to_thread(diff_sections, previous["text"], doc["text"])
+                return doc
+        text = await extract_file(path, file.filename)
+    finally:
+        os.remove(path)
+
+    # Splitting, scanning, indexing and hashing run off the event loop, like extraction
+    doc = await asyncio.to_thread(prepare_document, text, previous)
+    await asyncio.to_thread(document_store.put, doc["doc_id"], doc["digest"], text, doc["sections"],
+                            doc["risk_hits"], file_hash)
+    return doc
+
+
+async def resolve_text(text: Optional[str], doc_id: Optional[str], detail: str = "text required"):
+    """(text, digest) from either inline text or a stored doc_id"""
+    if doc_id:
+        stored = await asyncio.to_thread(document_store.get_text, doc_id)
+        if stored is None:
+            raise HTTPException(status_code=404, detail="unknown doc_id; upload the document again")
+        return stored
+    if not text:
+        raise HTTPException(status_code=400, detail=detail)
+    return text, None
+
 
 # Upload file
 @app.post("/upload")
-async def upload(file: UploadFile = File(...)):
-    raw = await file.read()
-    text = extract_text(raw, file.filename)
-    sections = split_sections(text)
-    risks = highlight_risks(text)
-    return {"text": text, "sections": sections, "risks": risks}
+async def upload(file: UploadFile = File(...), include_text: bool = True, previous_doc_id: Optional[str] = None):
+    # Re-upload of a revised contract: diff against the earlier version
+    previous = None
+    if previous_doc_id:
+        previous = await asyncio.to_thread(document_store.get, previous_doc_id)
+        if previous is None:
+            raise HTTPException(status_code=404, detail="unknown previous_doc_id; upload the document again")
+    doc = await load_document(file, previous)
+    risk_hits = doc["risk_hits"]
+    result = {
+        "doc_id": doc["doc_id"],
+        "sections": doc["sections"],
+        "risks": first_occurrences(risk_hits),
+        "risk_hits": risk_hits,
+        "risk_score": round(sum(h["weight"] for h in risk_hits), 2),
+    }
+    if include_text:
+        result["text"] = doc["text"]
+    if previous:
+        result["revision"] = revision_overview(doc["diff"], previous["risk_hits"], risk_hits, previous_doc_id)
+    return result
 
 
 
-# Analyze text
 # Analyze text
 @app.post("/analyze")
 async def analyze(body: AnalyzeBody):
-    if not body.text:
-        raise HTTPException(status_code=400, detail="text required")
-
-    prompt = ""
-    options = {"temperature": 0.3, "num_predict": 512}
-
-    # Mode handling
-    if body.mode == "summarize":
-        prompt = SUMMARIZE_PROMPT.format(content=body.text[:120000])
-    elif body.mode == "simplify":
-        prompt = SIMPLIFY_PROMPT.format(content=body.text[:16000])
-        options["num_predict"] = 400
-    elif body.mode == "qa":
-        q = body.question or ""
-        prompt = QA_PROMPT.format(content=body.text[:120000], question=q)
-        options["temperature"] = 0.2
-        options["num_predict"] = 384
-    else:
-        raise HTTPException(status_code=400, detail="unsupported mode")
+    text, digest = await resolve_text(body.text, body.doc_id)
 
     # Provider handling
     try:
-        if getattr(body, "provider", "gemini") == "ollama":
-            out = generate(prompt, options=options)
-            return {"result": out, "powered_by": "Ollama"}
-        else:
-            out = generate(prompt, options=options)
-            return {"result": out, "powered_by": "Google Gemini AI"}
+        out, cached, powered_by = await run_analysis(body.mode, text, body.question, digest=digest,
+                                                     provider=body.provider)
+        return {"result": out, "powered_by": powered_by, "cached": cached}
 
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"AI service error: {str(e)}")
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _error_event(e: Exception) -> dict:
+    """SSE error payload; status mirrors what the JSON endpoints would return"""
+    if isinstance(e, Overloaded):
+        return {"detail": f"AI service busy: {e}", "status": 429, "retry_after": e.retry_after}
+    return {"detail": f"AI service error: {str(e)}", "status": 503}
+
+
+def _done(data: dict) -> str:
+    """Final SSE event; carries the stage breakdown when the request is profiled"""
+    profile = current_profile()
+    if profile is not None:
+        data = {**data, "timings": profile_summary(profile)}
+    return _sse("done", data)
+
+
+def _sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Access-Control-Allow-Origin": "*"},
+    )
+
+
+# Analyze text, streamed as server-sent events
+@app.post("/analyze/stream")
+async def analyze_stream(body: AnalyzeBody):
+    text, digest = await resolve_text(body.text, body.doc_id)
+
+    async def events():
+        # Starlette cancels this generator when the client disconnects;
+        # closing the upstream stream then aborts the provider generation.
+        stream = stream_analysis(body.mode, text, body.question, digest=digest, provider=body.provider)
+        powered_by = None
+        try:
+            async for delta, powered_by in stream:
+                yield _sse("delta", {"text": delta})
+        except Exception as e:
+            yield _sse("error", _error_event(e))
+            return
+        finally:
+            await stream.aclose()
+        yield _done({"powered_by": powered_by})
+
+    return _sse_response(events())
+
+
+# Batch analysis: one document, many tasks, results streamed as they finish
+@app.post("/analyze/batch")
+async def analyze_batch(body: BatchBody):
+    doc_text, digest = await resolve_text(body.text, body.doc_id)
+    if not body.tasks:
+        raise HTTPException(status_code=400, detail="tasks required")
+
+    # Shared preprocessing, off the event loop: hash once; build the section index once for qa
+    digest = digest or await asyncio.to_thread(doc_hash, doc_text)
+    if any(t.mode == "qa" and not t.text for t in body.tasks):
+        await asyncio.to_thread(index_registry.get_or_build, doc_text, split_sections, digest)
+
+    async def run(i: int, task: BatchTask):
+        # A task may target its own text (a clause, a summary); default is the document
+        text, task_digest = (task.text, None) if task.text else (doc_text, digest)
+        try:
+            out, cached, powered_by = await run_analysis(task.mode, text, task.question, digest=task_digest,
+                                                         provider=body.provider)
+            return "result", {"id": task.id or str(i), "mode": task.mode, "result": out,
+                              "cached": cached, "powered_by": powered_by}
+        except Exception as e:
+            return "error", {"id": task.id or str(i), "mode": task.mode, **_error_event(e)}
+
+    async def events():
+        pending = [asyncio.ensure_future(run(i, t)) for i, t in enumerate(body.tasks)]
+        try:
+            for next_done in asyncio.as_completed(pending):
+                event, data = await next_done
+                yield _sse(event, data)
+        finally:
+            # Client went away: stop generations nobody will read
+            for task in pending:
+                task.cancel()
+        yield _done({})
+
+    return _sse_response(events())
+
+
+# Revised contract: summaries and risk hits for changed sections only
+@app.post("/analyze/revision")
+async def analyze_revision_endpoint(body: RevisionBody):
+    previous, current = await asyncio.gather(
+        asyncio.to_thread(document_store.get, body.previous_doc_id),
+        asyncio.to_thread(document_store.get, body.doc_id),
+    )
+    if previous is None or current is None:
+        raise HTTPException(status_code=404, detail="unknown doc_id; upload the document again")
+
+    try:
+        return await analyze_revision(previous, current, provider=body.provider)
+    except Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"AI service error: {str(e)}")
+
 # Enhance summary
 @app.post("/enhance-summary")
 async def enhance_summary(body: SimpleBody):
-    if not body.text:
-        raise HTTPException(status_code=400, detail="Text required")
+    text, digest = await resolve_text(body.text, body.doc_id, detail="Text required")
 
     try:
-        enhanced = gemini_generate(f"Enhance summary:\n{body.text[:2000]}", options={"num_predict": 512})
-        return {"enhanced_summary": enhanced, "powered_by": "Google Gemini AI"}
+        enhanced, _, powered_by = await run_analysis("enhance-summary", text, digest=digest, provider=body.provider)
+        return {"enhanced_summary": enhanced, "powered_by": powered_by}
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Google AI Studio not available: {str(e)}")
 
 # Risk analysis
 @app.post("/risk-analysis")
 async def risk_analysis(body: SimpleBody):
-    if not body.text:
-        raise HTTPException(status_code=400, detail="Text required")
+    text, digest = await resolve_text(body.text, body.doc_id, detail="Text required")
 
     try:
-        result = gemini_generate(f"Analyze risks:\n{body.text[:2000]}", options={"num_predict": 512})
-        return {"risk_analysis": result, "powered_by": "Google Gemini AI"}
+        result, _, powered_by = await run_analysis("risk-analysis", text, digest=digest, provider=body.provider)
+        return {"risk_analysis": result, "powered_by": powered_by}
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Risk analysis unavailable: {str(e)}")
 
 # Translate to Hindi
 @app.post("/translate-hindi")
 async def translate_hindi(body: SimpleBody):
-    if not body.text:
-        raise HTTPException(status_code=400, detail="Text required")
+    text, digest = await resolve_text(body.text, body.doc_id, detail="Text required")
 
     try:
-        result = gemini_generate(f"Translate to Hindi:\n{body.text[:1000]}", options={"num_predict": 512})
-        return {"hindi_translation": result, "powered_by": "Google Gemini AI"}
+        result, _, powered_by = await run_analysis("translate-hindi", text, digest=digest, provider=body.provider)
+        return {"hindi_translation": result, "powered_by": powered_by}
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Translation unavailable: {str(e)}")
 
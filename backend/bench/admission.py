@@ -0,0 +1,103 @@
+"""Overload test: tail latency with and without admission control.
+
+Usage: python -m backend.bench.admission [--rate 28] [--seconds 6]
+
+A stub provider serves at most --capacity calls at once and queues the
+rest internally, the way a saturated upstream does. Requests arrive open
+loop (Poisson) at --rate, 70% short qa calls and 30% long summarize calls,
+which is well past capacity. Without admission every call waits in one
+FIFO and qa latency grows with the backlog. With admission qa jumps ahead
+and work that cannot start within the deadline gets an immediate 429.
+A last run checks that admitted tokens stay within a tokens-per-minute
+budget.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+from backend.admission import MODE_PRIORITY, AdmissionController, Overloaded, ProviderGate
+from backend.router import Provider, ProviderRouter
+
+SERVICE_SECONDS = {"qa": 0.1, "summarize": 0.6}
+OPTIONS = {"qa": {"num_predict": 384}, "summarize": {"num_predict": 512}}
+
+
+class CapacityStub:
+    """Provider that runs `capacity` calls at a time and queues the rest"""
+
+    def __init__(self, capacity: int):
+        self.slots = asyncio.Semaphore(capacity)
+        self.tokens = 0
+
+    async def generate(self, prompt: str, options=None) -> str:
+        async with self.slots:
+            self.tokens += len(prompt) // 4 + (options or {}).get("num_predict", 0)
+            await asyncio.sleep(SERVICE_SECONDS[prompt.split(":", 1)[0]] * random.uniform(0.8, 1.2))
+        return "ok"
+
+
+def pct(values, q: float) -> str:
+    if not values:
+        return "     -"
+    ordered = sorted(values)
+    return f"{ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000:6.0f}"
+
+
+async def run(label: str, gate: ProviderGate, rate: float, seconds: float, capacity: int) -> CapacityStub:
+    random.seed(7)
+    stub = CapacityStub(capacity)
+    router = ProviderRouter([Provider("stub", "Stub", "stub", stub.generate, timeout=60)], hedge=False,
+                            admission=AdmissionController({"stub": gate}))
+    ok, shed, failed = defaultdict(list), defaultdict(list), defaultdict(int)
+
+    async def one(mode: str):
+        started = time.perf_counter()
+        try:
+            await router.generate(f"{mode}: " + "clause " * 200, OPTIONS[mode], priority=MODE_PRIORITY[mode])
+            ok[mode].append(time.perf_counter() - started)
+        except Overloaded:
+            shed[mode].append(time.perf_counter() - started)
+        except Exception:
+            failed[mode] += 1
+
+    tasks = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        tasks.append(asyncio.ensure_future(one("qa" if random.random() < 0.7 else "summarize")))
+        await asyncio.sleep(random.expovariate(rate))
+    await asyncio.gather(*tasks)
+
+    print(f"\n{label}")
+    print("  mode        served  p50ms  p95ms  p99ms   shed  shed-p99ms  failed")
+    for mode in ("qa", "summarize"):
+        print(f"  {mode:<10} {len(ok[mode]):>7} {pct(ok[mode], .5)} {pct(ok[mode], .95)} {pct(ok[mode], .99)} "
+              f"{len(shed[mode]):>6}     {pct(shed[mode], .99)} {failed[mode]:>7}")
+    return stub
+
+
+async def main(rate: float, seconds: float, capacity: int) -> None:
+    print(f"{rate:g} req/s for {seconds:g}s against a provider with {capacity} slots "
+          f"(capacity ~{capacity / (0.7 * SERVICE_SECONDS['qa'] + 0.3 * SERVICE_SECONDS['summarize']):.0f} req/s)")
+    unlimited = ProviderGate("stub", max_concurrency=10 ** 6, max_queue=10 ** 6, max_wait=3600)
+    await run("no admission control", unlimited, rate, seconds, capacity)
+    gate = ProviderGate("stub", max_concurrency=capacity, max_queue=64, max_wait=2.0)
+    await run("admission: 4 slots, queue 64, 2s deadline, qa first", gate, rate, seconds, capacity)
+
+    budget = 60000
+    gate = ProviderGate("stub", max_concurrency=capacity, max_queue=64, max_wait=2.0, tokens_per_minute=budget)
+    started = time.perf_counter()
+    stub = await run(f"admission + {budget} tokens/minute budget", gate, rate, seconds, capacity)
+    elapsed = time.perf_counter() - started
+    # The bucket starts full, so the ceiling is one minute's burst plus refill
+    print(f"  tokens admitted {stub.tokens} in {elapsed:.1f}s; ceiling {budget + budget * elapsed / 60:.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=28)
+    parser.add_argument("--seconds", type=float, default=6)
+    parser.add_argument("--capacity", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.rate, args.seconds, args.capacity))
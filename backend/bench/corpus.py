@@ -0,0 +1,25 @@
+"""Synthetic contracts for the benchmarks"""
+import random
+
+_TOPICS = [
+    ("PAYMENT TERMS", "The Tenant shall pay monthly rent of INR {n} on or before the fifth day of each month. A late fee of two percent applies to overdue amounts."),
+    ("TERMINATION", "Either party may terminate this agreement with {n} days written notice. Termination for breach takes effect immediately upon notice."),
+    ("INDEMNITY", "The Service Provider shall indemnify the Client against all losses arising from negligence, subject to the liability cap of INR {n}."),
+    ("CONFIDENTIALITY", "Each party shall keep confidential all information disclosed under this agreement for {n} months after expiry."),
+    ("DISPUTE RESOLUTION", "Any dispute shall be referred to arbitration seated in Mumbai under the Arbitration and Conciliation Act, 1996, within {n} days."),
+    ("GOVERNING LAW", "This agreement is governed by the laws of India and the courts at New Delhi have exclusive jurisdiction. Reference {n}."),
+    ("RENEWAL", "This agreement shall auto-renewal for successive terms of {n} months unless either party gives notice of non-renewal."),
+    ("MAINTENANCE", "The Landlord is responsible for structural repairs; the Tenant bears routine upkeep costs up to INR {n} per year."),
+]
+
+
+def make_contract(sections: int = 200, paragraphs: int = 3, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    parts = ["This Agreement is made between Asha Estates Pvt Ltd (Landlord) and R. Kumar (Tenant)."]
+    for i in range(1, sections + 1):
+        title, sentence = _TOPICS[rng.randrange(len(_TOPICS))]
+        parts.append(f"{i}. {title} {i}")
+        for _ in range(paragraphs):
+            parts.append(" ".join(sentence.format(n=rng.randint(10, 99999)) for _ in range(3)))
+            parts.append("")
+    return "\n".join(parts)
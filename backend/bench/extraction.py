@@ -0,0 +1,121 @@
+"""Extraction benchmark: in-memory serial extract_text vs spooled parallel extract_file.
+
+Usage: python -m backend.bench.extraction [--pages 300]
+
+Generates a text PDF and a DOCX of comparable size, then runs each path in
+a fresh subprocess so peak RSS is isolated. For the parallel path, peak RSS
+is the parent's plus each extraction worker's high-water mark, read from
+/proc before the pool is shut down (Linux only).
+"""
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from backend.bench.corpus import make_contract
+
+
+def write_pdf(path: str, pages: int, lines_per_page: int = 45) -> None:
+    """Minimal uncompressed text PDF; one Helvetica content stream per page"""
+    lines = make_contract(sections=pages * 4).splitlines()
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for p in range(pages):
+        chunk = lines[p * lines_per_page:(p + 1) * lines_per_page] or ["(blank)"]
+        ops = ["BT /F1 9 Tf 40 800 Td 12 TL"]
+        for line in chunk:
+            safe = line[:110].replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"({safe}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        " ".join(f"{k} 0 R" for k in kids).encode(), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_docx(path: str, pages: int) -> None:
+    from docx import Document
+
+    doc = Document()
+    for line in make_contract(sections=pages * 4).splitlines():
+        doc.add_paragraph(line)
+    doc.save(path)
+
+
+def peak_rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    return 0
+
+
+def run_once(mode: str, path: str) -> None:
+    """Child process: extract once, print elapsed seconds and peak RSS in MB"""
+    from backend import extract
+
+    workers_kb = 0
+    start = time.perf_counter()
+    if mode == "serial":
+        with open(path, "rb") as f:
+            text = extract.extract_text(f.read(), path)
+        elapsed = time.perf_counter() - start
+    else:
+        text = asyncio.run(extract.extract_file(path, path))
+        elapsed = time.perf_counter() - start
+        # Workers are still alive here; shutdown_pool doesn't wait, so they never reach RUSAGE_CHILDREN
+        if extract._pool is not None:
+            workers_kb = sum(peak_rss_kb(pid) for pid in extract._pool._processes)
+        extract.shutdown_pool()
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + workers_kb
+    print(f"{elapsed} {kb / 1024} {len(text)}")
+
+
+def main(pages: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        files = [os.path.join(tmp, "contract.pdf"), os.path.join(tmp, "contract.docx")]
+        write_pdf(files[0], pages)
+        write_docx(files[1], pages)
+        print(f"{pages} pages; workers={os.getenv('EXTRACT_WORKERS', 'default')}")
+        print(f"{'file':<6} {'path':<9} {'seconds':>8} {'pages/s':>9} {'peak RSS MB':>12} {'chars':>10}")
+        for path in files:
+            kind = path.rsplit(".", 1)[1]
+            for mode in ("serial", "parallel"):
+                out = subprocess.run(
+                    [sys.executable, "-m", "backend.bench.extraction", "--run", mode, path],
+                    capture_output=True, text=True, check=True,
+                ).stdout.split()
+                elapsed, rss, chars = float(out[0]), float(out[1]), int(out[2])
+                print(f"{kind:<6} {mode:<9} {elapsed:8.2f} {pages / elapsed:9.1f} {rss:12.1f} {chars:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--run", nargs=2, metavar=("MODE", "PATH"))
+    args = parser.parse_args()
+    if args.run:
+        run_once(*args.run)
+    else:
+        main(args.pages)
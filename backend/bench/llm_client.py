@@ -0,0 +1,63 @@
+"""Load benchmark: blocking `requests.post` vs the pooled async client.
+
+Usage: python -m backend.bench.llm_client [--requests 64] [--latency 0.2]
+
+Both paths are driven from coroutines on one event loop, the way FastAPI
+handlers call them. The blocking path serialises every generation; the
+async path keeps up to LLM_MAX_CONCURRENCY in flight over reused sockets.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+
+import requests  # noqa: E402
+
+from backend import ollama_client  # noqa: E402
+from backend.bench.stub_llm import StubLLMServer  # noqa: E402
+
+
+async def run_blocking(url: str, n: int) -> None:
+    payload = ollama_client.build_payload("bench prompt", {"num_predict": 64})
+
+    async def one():
+        # Same call shape as the old generate(): new connection, loop blocked
+        resp = requests.post(url, headers={"Content-Type": "application/json"}, json=payload, timeout=60)
+        resp.raise_for_status()
+
+    await asyncio.gather(*(one() for _ in range(n)))
+
+
+async def run_async(n: int) -> None:
+    await asyncio.gather(*(ollama_client.generate("bench prompt", {"num_predict": 64}) for _ in range(n)))
+
+
+async def measure(label: str, stub: StubLLMServer, coro) -> None:
+    stub.connections = 0
+    start = time.perf_counter()
+    await coro
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {stub.requests:>5} req  {elapsed:7.2f}s  {stub.requests / elapsed:8.1f} req/s  {stub.connections:>4} connections")
+    stub.requests = 0
+
+
+async def main(n: int, latency: float) -> None:
+    stub = StubLLMServer(latency=latency).start_in_thread()
+    ollama_client.GEMINI_URL = f"{stub.url}/models"
+    url = f"{ollama_client.GEMINI_URL}/{ollama_client.GEMINI_MODEL}:generateContent?key=bench"
+    print(f"stub latency {latency * 1000:.0f}ms, max concurrency {ollama_client.LLM_MAX_CONCURRENCY}")
+    try:
+        await measure("blocking", stub, run_blocking(url, n))
+        await measure("async", stub, run_async(n))
+    finally:
+        await ollama_client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.latency))
@@ -0,0 +1,65 @@
+"""QA prompt benchmark: full-text stuffing vs top-k section retrieval.
+
+Usage: python -m backend.bench.qa_retrieval [--latency-per-kb 0.01]
+
+For each contract size, reports prompt size, whether the answering clause
+(placed at the end of the document) reached the model, index build and
+search time, and round-trip latency against a stub whose delay grows with
+the prompt size.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+
+from backend import ollama_client  # noqa: E402
+from backend.bench.corpus import make_contract  # noqa: E402
+from backend.bench.stub_llm import StubLLMServer  # noqa: E402
+from backend.extract import split_sections  # noqa: E402
+from backend.prompts import QA_PROMPT  # noqa: E402
+from backend.retrieval import SectionIndex, format_context  # noqa: E402
+
+NEEDLE = "\n999. SECURITY DEPOSIT\nThe security deposit of INR 4,50,000 is refundable within 45 days of handover.\n"
+QUESTION = "When is the security deposit refunded?"
+
+
+async def timed_generate(prompt: str) -> float:
+    start = time.perf_counter()
+    await ollama_client.generate(prompt, {"temperature": 0.2, "num_predict": 384})
+    return time.perf_counter() - start
+
+
+async def main(latency_per_kb: float) -> None:
+    stub = await StubLLMServer(latency=0.05, latency_per_kb=latency_per_kb).start()
+    ollama_client.GEMINI_URL = f"{stub.url}/models"
+    print(f"{'doc chars':>10} {'mode':<10} {'prompt chars':>12} {'found':>6} {'build ms':>9} {'search ms':>9} {'llm s':>7}")
+    try:
+        for n_sections in (50, 200, 800, 2000):
+            text = make_contract(sections=n_sections) + NEEDLE
+
+            full = QA_PROMPT.format(content=text[:120000], question=QUESTION)
+            llm = await timed_generate(full)
+            print(f"{len(text):>10} {'full':<10} {len(full):>12} {str('4,50,000' in full):>6} {'-':>9} {'-':>9} {llm:7.2f}")
+
+            start = time.perf_counter()
+            index = SectionIndex(split_sections(text))
+            build = time.perf_counter() - start
+            start = time.perf_counter()
+            chunks = index.search(QUESTION, k=4)
+            search = time.perf_counter() - start
+            topk = QA_PROMPT.format(content=format_context(chunks), question=QUESTION)
+            llm = await timed_generate(topk)
+            print(f"{len(text):>10} {'top-4':<10} {len(topk):>12} {str('4,50,000' in topk):>6} "
+                  f"{build * 1000:9.1f} {search * 1000:9.2f} {llm:7.2f}")
+    finally:
+        await ollama_client.aclose()
+        await stub.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency-per-kb", type=float, default=0.01)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency_per_kb))
@@ -0,0 +1,102 @@
+"""Re-review benchmark: full re-analysis of a revised contract vs the section delta.
+
+Usage: python -m backend.bench.revision [--sections 60] [--edits 3]
+
+Builds a contract and a revision that rewrites a few clauses and inserts
+one. The stub LLM's latency grows with prompt size, like a real model's
+prefill. Counts LLM calls, prompt characters and wall time for
+summarizing the revision from scratch, for summarizing it after the
+original (warm section cache), and for /analyze/revision's delta; then
+times full vs incremental risk scans.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from backend.analysis import run_analysis
+from backend.bench.corpus import make_contract
+from backend.cache import doc_hash, result_cache
+from backend.extract import scan_risks, section_starts
+from backend.revisions import analyze_revision, diff_sections, incremental_risk_hits
+from backend.router import Provider, provider_router
+
+
+class CountingStub:
+    def __init__(self, latency: float, per_kchar: float):
+        self.latency = latency
+        self.per_kchar = per_kchar
+        self.calls = 0
+        self.prompt_chars = 0
+
+    async def generate(self, prompt: str, options=None) -> str:
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        await asyncio.sleep(self.latency + self.per_kchar * len(prompt) / 1000)
+        return f"summary {self.calls}"
+
+
+def revise(text: str, edits: int, seed: int = 5) -> str:
+    """Rewrite the body of `edits` clauses and insert one new clause"""
+    random.seed(seed)
+    lines = text.splitlines(keepends=True)
+    starts = [i for i, line in enumerate(lines) if line[:1].isdigit()]
+    for i in random.sample(starts[1:-1], edits):
+        lines[i + 1] = "The Tenant shall pay a late fee of 2% per month; the penalty is capped. " + lines[i + 1]
+    at = starts[len(starts) // 2]
+    lines[at:at] = ["ARBITRATION AND SEAT\n", "Disputes go to arbitration in Mumbai under the 1996 Act.\n"]
+    return "".join(lines)
+
+
+async def timed(label: str, stub: CountingStub, coro) -> None:
+    calls, chars, started = stub.calls, stub.prompt_chars, time.perf_counter()
+    await coro
+    print(f"{label:<40} {stub.calls - calls:>4} calls {stub.prompt_chars - chars:>8} prompt chars "
+          f"{time.perf_counter() - started:7.2f}s")
+
+
+def best_of(fn, *args, repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+async def main(sections: int, edits: int, latency: float, per_kchar: float) -> None:
+    v1 = make_contract(sections=sections, seed=1)
+    v2 = revise(v1, edits)
+    hits1, hits2 = scan_risks(v1), scan_risks(v2)
+    previous = {"doc_id": doc_hash(v1), "text": v1, "risk_hits": hits1}
+    current = {"doc_id": doc_hash(v2), "text": v2, "risk_hits": hits2}
+    diff = diff_sections(v1, v2)
+    print(f"{len(v2)} chars, {len(section_starts(v2))} sections; revision: {len(diff['modified'])} modified, "
+          f"{len(diff['added'])} added, {len(diff['unchanged'])} unchanged\n")
+
+    stub = CountingStub(latency, per_kchar)
+    provider_router.providers = [Provider("stub", "Stub", "stub", stub.generate)]
+
+    await timed("summarize revision, cold cache", stub, run_analysis("summarize", v2))
+    result_cache._mem.clear()
+    await run_analysis("summarize", v1)
+    await timed("summarize revision after original", stub, run_analysis("summarize", v2))
+    result_cache._mem.clear()
+    await timed("revision delta (changed sections only)", stub, analyze_revision(previous, current))
+
+    full = best_of(scan_risks, v2)
+    differ = best_of(diff_sections, v1, v2)
+    incremental = best_of(incremental_risk_hits, hits1, v2, diff)
+    assert incremental_risk_hits(hits1, v2, diff) == hits2
+    print(f"\nsection diff {differ * 1000:.2f}ms; risk scan: full {full * 1000:.2f}ms, "
+          f"incremental {incremental * 1000:.2f}ms (identical hits)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sections", type=int, default=60)
+    parser.add_argument("--edits", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per call")
+    parser.add_argument("--per-kchar", type=float, default=0.05, help="extra seconds per 1000 prompt chars")
+    args = parser.parse_args()
+    asyncio.run(main(args.sections, args.edits, args.latency, args.per_kchar))
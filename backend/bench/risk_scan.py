@@ -0,0 +1,72 @@
+"""Risk scan micro-benchmark: per-keyword str.find vs the compiled RiskScanner.
+
+Usage: python -m backend.bench.risk_scan [--mb 2 8]
+
+The legacy scan reports only each keyword's first occurrence; the
+"find all" column repeats it for every occurrence, which is the fair
+baseline for the scanner, since that reports every occurrence with its
+section. The last column repeats the
+scan with 200 extra keywords to show cost is flat in keyword count.
+"""
+import argparse
+import time
+
+from backend.bench.corpus import make_contract
+from backend.extract import RISK_KEYWORDS, RiskScanner, load_risk_keywords
+
+
+def legacy_highlight_risks(text: str):
+    hits = []
+    lower = text.lower()
+    for kw in RISK_KEYWORDS:
+        idx = lower.find(kw)
+        if idx != -1:
+            hits.append((kw, idx))
+    return hits
+
+
+def find_all_risks(text: str):
+    hits = []
+    lower = text.lower()
+    for kw in RISK_KEYWORDS:
+        idx = lower.find(kw)
+        while idx != -1:
+            hits.append((kw, idx))
+            idx = lower.find(kw, idx + 1)
+    return hits
+
+
+def best_of(fn, text: str, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(sizes) -> None:
+    scanner = RiskScanner(load_risk_keywords())
+    extra = dict(load_risk_keywords())
+    extra.update({f"clause term {i}": 0.5 for i in range(200)})
+    big = RiskScanner(extra)
+
+    base = make_contract(sections=400)
+    print(f"{'MB':>5} {'legacy ms':>10} {'hits':>6} {'find all ms':>12} {'hits':>7} "
+          f"{'scan ms':>9} {'hits':>7} {'MB/s':>7} {'+200 kw ms':>11}")
+    for mb in sizes:
+        text = (base * (int(mb * 1024 * 1024 / len(base)) + 1))[: int(mb * 1024 * 1024)]
+        legacy, legacy_hits = best_of(legacy_highlight_risks, text)
+        find_all, all_hits = best_of(find_all_risks, text)
+        scan, hits = best_of(scanner.scan, text)
+        wide, _ = best_of(big.scan, text)
+        print(f"{mb:>5} {legacy * 1000:10.1f} {len(legacy_hits):>6} {find_all * 1000:12.1f} {len(all_hits):>7} "
+              f"{scan * 1000:9.1f} {len(hits):>7} "
+              f"{mb / scan:7.1f} {wide * 1000:11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=float, nargs="+", default=[2, 8])
+    args = parser.parse_args()
+    main(args.mb)
@@ -0,0 +1,99 @@
+"""Provider router benchmark with in-process stub providers.
+
+Usage: python -m backend.bench.router [--requests 400]
+
+Each stub has a base latency, an occasional slow tail and a failure rate.
+Scenarios compare a single provider, hedging, and fallback behind an open
+circuit breaker, reporting latency percentiles and who served what.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+
+from backend.admission import AdmissionController, ProviderGate
+from backend.router import Provider, ProviderRouter
+
+
+class StubProvider:
+    def __init__(self, latency: float, tail_rate: float = 0.0, tail_latency: float = 0.0,
+                 failure_rate: float = 0.0, hang: bool = False):
+        self.latency = latency
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.failure_rate = failure_rate
+        self.hang = hang
+
+    async def generate(self, prompt: str, options=None) -> str:
+        if self.hang:
+            await asyncio.sleep(3600)
+        slow = random.random() < self.tail_rate
+        await asyncio.sleep(self.tail_latency if slow else self.latency * random.uniform(0.8, 1.2))
+        if random.random() < self.failure_rate:
+            raise RuntimeError("stub 503")
+        return "ok"
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def run(label: str, router: ProviderRouter, n: int, concurrency: int = 16) -> None:
+    limit = asyncio.Semaphore(concurrency)
+    latencies, served, errors = [], Counter(), 0
+
+    async def one():
+        nonlocal errors
+        async with limit:
+            start = time.perf_counter()
+            try:
+                _, provider = await router.generate("bench prompt")
+                served[provider.name] += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(n)))
+    print(f"{label:<26} p50 {percentile(latencies, .5) * 1000:7.0f}ms  p95 {percentile(latencies, .95) * 1000:7.0f}ms  "
+          f"p99 {percentile(latencies, .99) * 1000:7.0f}ms  errors {errors:>4}  served {dict(served)}")
+
+
+def provider(name: str, stub: StubProvider, timeout: float = 5.0) -> Provider:
+    return Provider(name, name, "stub", stub.generate, timeout=timeout)
+
+
+def make_router(providers, **kwargs) -> ProviderRouter:
+    # Admission out of the way, so only routing behaviour is measured
+    gates = {p.name: ProviderGate(p.name, max_concurrency=10 ** 6, max_queue=10 ** 6, max_wait=3600) for p in providers}
+    return ProviderRouter(providers, admission=AdmissionController(gates), **kwargs)
+
+
+async def main(n: int) -> None:
+    random.seed(1)
+    tail = dict(latency=0.05, tail_rate=0.05, tail_latency=1.5)
+
+    await run("single, 5% slow tail", make_router([provider("primary", StubProvider(**tail))], hedge=False), n)
+    await run("hedged, 5% slow tail", make_router([
+        provider("primary", StubProvider(**tail)),
+        provider("secondary", StubProvider(latency=0.08)),
+    ], hedge_after=0.2), n)
+    await run("no fallback, 30% errors", make_router([
+        provider("primary", StubProvider(latency=0.05, failure_rate=0.3)),
+    ], hedge=False), n)
+    await run("fallback, 30% errors", make_router([
+        provider("primary", StubProvider(latency=0.05, failure_rate=0.3)),
+        provider("secondary", StubProvider(latency=0.08)),
+    ], hedge=False), n)
+    await run("primary hung, breaker", make_router([
+        provider("primary", StubProvider(latency=0, hang=True), timeout=0.5),
+        provider("secondary", StubProvider(latency=0.08)),
+    ], hedge=False), n)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,97 @@
+"""Cold-start benchmark: `import backend.app` time and time to first /health.
+
+Usage: python -m backend.bench.startup [--runs 5]
+
+Each run is a fresh interpreter with no GEMINI_API_KEY and a throwaway
+DOCSTORE_PATH, so it also checks that import neither fails on missing
+configuration nor touches the filesystem. Reports which heavy optional
+modules the import pulled in; none should be loaded before first use.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+# Imported only when a provider or an upload needs them
+HEAVY_MODULES = ["google.generativeai", "grpc", "pypdf", "docx", "httpx"]
+
+IMPORT_SNIPPET = """
+import json, sys, time
+t = time.perf_counter()
+import backend.app
+elapsed = time.perf_counter() - t
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def clean_env(tmp: str) -> dict:
+    env = {k: v for k, v in os.environ.items() if k not in ("GEMINI_API_KEY", "GOOGLE_API_KEY")}
+    env["DOCSTORE_PATH"] = os.path.join(tmp, "documents.sqlite3")
+    return env
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_import(env: dict, cwd: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], env=env, cwd=cwd,
+                         capture_output=True, text=True)
+    if out.returncode:
+        raise RuntimeError(f"import failed:\n{out.stderr}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def time_first_health(env: dict, cwd: str, timeout: float = 60.0) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.app:app", "--port", str(port), "--log-level", "warning"],
+        env=env, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with code {proc.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("server did not answer /health in time")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main(runs: int) -> None:
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    with tempfile.TemporaryDirectory() as tmp:
+        env = clean_env(tmp)
+        imports = [time_import(env, root) for _ in range(runs)]
+        health = [time_first_health(env, root) for _ in range(runs)]
+        created = os.path.exists(env["DOCSTORE_PATH"])
+
+    seconds = [r["seconds"] for r in imports]
+    print(f"import backend.app   median {statistics.median(seconds) * 1000:6.0f}ms  "
+          f"min {min(seconds) * 1000:6.0f}ms  ({runs} runs)")
+    print(f"first /health        median {statistics.median(health) * 1000:6.0f}ms  "
+          f"min {min(health) * 1000:6.0f}ms  (process spawn to 200 OK)")
+    print(f"heavy modules loaded {imports[0]['loaded'] or 'none'}")
+    print(f"docstore file created by startup: {created}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    main(args.runs)
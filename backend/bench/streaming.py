@@ -0,0 +1,59 @@
+"""Time-to-first-token benchmark: generate() vs stream_generate().
+
+Usage: python -m backend.bench.streaming [--tokens 200] [--token-latency 0.01]
+
+Also checks that abandoning a stream early stops the stub from producing
+the rest of the output.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+
+from backend import ollama_client  # noqa: E402
+from backend.bench.stub_llm import StubLLMServer  # noqa: E402
+
+
+async def main(tokens: int, token_latency: float) -> None:
+    stub = await StubLLMServer(latency=0.3, tokens=tokens, token_latency=token_latency).start()
+    ollama_client.GEMINI_URL = f"{stub.url}/models"
+    print(f"stub: 300ms prefill, {tokens} tokens at {token_latency * 1000:.0f}ms each")
+    try:
+        start = time.perf_counter()
+        await ollama_client.generate("bench prompt")
+        total = time.perf_counter() - start
+        print(f"{'blocking':<10} first token {total:6.2f}s  complete {total:6.2f}s")
+
+        start = time.perf_counter()
+        first = None
+        async for _ in ollama_client.stream_generate("bench prompt"):
+            if first is None:
+                first = time.perf_counter() - start
+        total = time.perf_counter() - start
+        print(f"{'streaming':<10} first token {first:6.2f}s  complete {total:6.2f}s")
+
+        stub.tokens_sent = 0
+        stream = ollama_client.stream_generate("bench prompt")
+        received = 0
+        async for _ in stream:
+            received += 1
+            if received == 5:
+                break
+        await stream.aclose()
+        # Give the stub a few token intervals to notice the dropped connection
+        await asyncio.sleep(token_latency * 10 + 0.05)
+        print(f"cancelled after {received} tokens: stub produced {stub.tokens_sent}/{tokens}, "
+              f"streams cancelled {stub.streams_cancelled}")
+    finally:
+        await ollama_client.aclose()
+        await stub.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    args = parser.parse_args()
+    asyncio.run(main(args.tokens, args.token_latency))
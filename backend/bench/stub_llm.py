@@ -0,0 +1,120 @@
+"""Tiny local stand-in for the Gemini REST API, used by the benchmarks.
+
+Speaks just enough HTTP/1.1 (keep-alive, Content-Length bodies) to answer
+`:generateContent` after a configurable delay and `:streamGenerateContent`
+as chunked SSE. It counts the TCP connections clients opened, so pooling is
+visible in the results, and the streams clients abandoned part-way.
+"""
+import asyncio
+import json
+import random
+import threading
+
+
+class StubLLMServer:
+    def __init__(self, latency: float = 0.2, failure_rate: float = 0.0, reply: str = "- stub bullet",
+                 latency_per_kb: float = 0.0, tokens: int = 1, token_latency: float = 0.0):
+        self.latency = latency
+        # Extra delay per KB of request body, mimicking prompt-processing cost
+        self.latency_per_kb = latency_per_kb
+        self.failure_rate = failure_rate
+        self.reply = reply
+        # Output is `tokens` copies of `reply`, each taking `token_latency` to decode
+        self.tokens = tokens
+        self.token_latency = token_latency
+        self.connections = 0
+        self.requests = 0
+        self.tokens_sent = 0
+        self.streams_cancelled = 0
+        self._server = None
+        self.port = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def start_in_thread(self):
+        """Run the server on its own loop so blocking clients can't stall it"""
+        ready = threading.Event()
+        loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start())
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+        return self
+
+    @staticmethod
+    def _candidate(text: str) -> bytes:
+        return json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]}).encode()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        streaming = False
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value.strip())
+                if length:
+                    await reader.readexactly(length)
+                self.requests += 1
+
+                await asyncio.sleep(self.latency + self.latency_per_kb * length / 1024)
+                if random.random() < self.failure_rate:
+                    body = b'{"error": "stub failure"}'
+                    writer.write(
+                        b"HTTP/1.1 503 Service Unavailable\r\nContent-Type: application/json\r\n"
+                        b"Content-Length: %d\r\nConnection: keep-alive\r\n\r\n" % len(body) + body
+                    )
+                elif b":streamGenerateContent" in request_line:
+                    streaming = True
+                    writer.write(
+                        b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                        b"Transfer-Encoding: chunked\r\nConnection: keep-alive\r\n\r\n"
+                    )
+                    for i in range(self.tokens):
+                        if i:
+                            await asyncio.sleep(self.token_latency)
+                        event = b"data: " + self._candidate(self.reply + " ") + b"\r\n\r\n"
+                        writer.write(b"%x\r\n%s\r\n" % (len(event), event))
+                        await writer.drain()
+                        self.tokens_sent += 1
+                    writer.write(b"0\r\n\r\n")
+                    streaming = False
+                else:
+                    await asyncio.sleep(self.token_latency * max(self.tokens - 1, 0))
+                    self.tokens_sent += self.tokens
+                    body = self._candidate(" ".join([self.reply] * self.tokens))
+                    writer.write(
+                        b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                        b"Content-Length: %d\r\nConnection: keep-alive\r\n\r\n" % len(body) + body
+                    )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            if streaming:
+                self.streams_cancelled += 1
+        finally:
+            writer.close()
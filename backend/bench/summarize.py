@@ -0,0 +1,78 @@
+"""Summarization benchmark: one truncated call vs map-reduce over sections.
+
+Usage: python -m backend.bench.summarize [--sections 300]
+
+Token counts are estimated at 4 characters per token. The stub's delay
+grows with prompt size and output length, so wall-clock reflects both
+prefill and decode. The "warm" row re-runs map-reduce with the section
+summaries already cached.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+
+from backend import ollama_client  # noqa: E402
+from backend.bench.corpus import make_contract  # noqa: E402
+from backend.bench.stub_llm import StubLLMServer  # noqa: E402
+from backend.extract import split_sections  # noqa: E402
+from backend.prompts import SUMMARIZE_PROMPT  # noqa: E402
+from backend.summarize import map_sections, reduce_prompt  # noqa: E402
+
+
+class Meter:
+    def __init__(self):
+        self.calls = 0
+        self.prompt_chars = 0
+        self.output_chars = 0
+
+    async def generate(self, prompt, options=None):
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        out = await ollama_client.generate(prompt, options=options)
+        self.output_chars += len(out)
+        return out
+
+    def row(self, label: str, elapsed: float, covered: int, total: int) -> str:
+        return (f"{label:<12} {elapsed:8.2f}s {self.calls:>6} {self.prompt_chars // 4:>10} "
+                f"{self.output_chars // 4:>8} {100 * covered / total:>8.0f}%")
+
+
+async def run_map_reduce(text: str, meter: Meter) -> None:
+    async def generate(prompt, options=None):
+        return await meter.generate(prompt, options), ollama_client.GEMINI_MODEL
+
+    partials, _ = await map_sections(split_sections(text), generate, ollama_client.GEMINI_MODEL)
+    await meter.generate(reduce_prompt(partials), {"temperature": 0.3, "num_predict": 512})
+
+
+async def main(sections: int) -> None:
+    stub = await StubLLMServer(latency=0.2, latency_per_kb=0.01, reply="tok", tokens=120,
+                               token_latency=0.005).start()
+    ollama_client.GEMINI_URL = f"{stub.url}/models"
+    text = make_contract(sections=sections)
+    print(f"document: {len(text)} chars, {len(split_sections(text))} sections")
+    print(f"{'path':<12} {'wall':>9} {'calls':>6} {'in tokens':>10} {'out tok':>8} {'coverage':>9}")
+    try:
+        meter = Meter()
+        start = time.perf_counter()
+        await meter.generate(SUMMARIZE_PROMPT.format(content=text[:120000]), {"temperature": 0.3, "num_predict": 512})
+        print(meter.row("single-call", time.perf_counter() - start, min(len(text), 120000), len(text)))
+
+        for label in ("map-reduce", "warm"):
+            meter = Meter()
+            start = time.perf_counter()
+            await run_map_reduce(text, meter)
+            print(meter.row(label, time.perf_counter() - start, len(text), len(text)))
+    finally:
+        await ollama_client.aclose()
+        await stub.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sections", type=int, default=300)
+    args = parser.parse_args()
+    asyncio.run(main(args.sections))
@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so re-extracted copies of a document hash the same"""
+    return _WS_RE.sub(" ", text).strip()
+
+
+def doc_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def text_hash(text: str) -> str:
+    """Hash of the exact text, for stores whose offsets must stay valid"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Content-addressed cache for LLM results.
+
+    Tier 1 is an in-process LRU bounded by entry count and TTL. Tier 2 is an
+    optional SQLite file that survives restarts; disk hits are promoted back
+    into memory. Disk reads and writes run in a worker thread, and the file
+    is pruned of expired rows and down to max_disk_entries every
+    PRUNE_EVERY writes. Each entry remembers how long its generation took so
+    hits can be reported as LLM time saved.
+    """
+
+    PRUNE_EVERY = 64
+
+    def __init__(self, max_entries: int = 512, ttl: float = 24 * 3600, db_path: Optional[str] = None,
+                 max_disk_entries: int = 10000):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Separate lock so disk I/O in worker threads never holds up memory lookups
+        self._db_lock = threading.Lock()
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.generation_seconds = 0.0
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # Opened on first use (always under _db_lock, in a worker thread) so
+        # importing the app stays side-effect free
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, cost REAL NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS results_created ON results (created);"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(mode: str, text: str, question: Optional[str], options: Optional[dict], model: str,
+                 digest: Optional[str] = None) -> str:
+        """Cache key; pass a precomputed doc_hash(text) as digest to skip rehashing"""
+        parts = [
+            mode,
+            digest or doc_hash(text),
+            normalize_text(question or ""),
+            json.dumps(options or {}, sort_keys=True),
+            model,
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl > 0 and time.time() - created > self.ttl
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                value, created, cost = entry
+                if not self._expired(created):
+                    self._mem.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    self.saved_seconds += cost
+                    return value
+                del self._mem[key]
+
+        entry = await asyncio.to_thread(self._disk_get, key) if self.db_path else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            value, _, cost = entry
+            self._put_mem(key, entry)
+            self.hits += 1
+            self.disk_hits += 1
+            self.saved_seconds += cost
+            return value
+
+    async def set(self, key: str, value: str, cost_seconds: float = 0.0) -> None:
+        entry = (value, time.time(), cost_seconds)
+        with self._lock:
+            self.generation_seconds += cost_seconds
+            self._put_mem(key, entry)
+        if self.db_path:
+            await asyncio.to_thread(self._disk_set, key, entry)
+
+    def _disk_get(self, key: str) -> Optional[tuple]:
+        with self._db_lock:
+            row = self._db.execute("SELECT value, created, cost FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None or not self._expired(row[1]):
+                return row
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+
+    def _disk_set(self, key: str, entry: tuple) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, value, created, cost) VALUES (?, ?, ?, ?)",
+                (key, *entry),
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 1:
+                self._prune()
+            self._db.commit()
+
+    def _prune(self) -> None:
+        if self.ttl > 0:
+            self._db.execute("DELETE FROM results WHERE created < ?", (time.time() - self.ttl,))
+        self._db.execute(
+            "DELETE FROM results WHERE key IN "
+            "(SELECT key FROM results ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+    def _put_mem(self, key: str, entry: tuple) -> None:
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._mem),
+            "llm_seconds_saved": round(self.saved_seconds, 3),
+            "llm_seconds_spent": round(self.generation_seconds, 3),
+        }
+
+
+# Global instance
+result_cache = ResultCache(
+    max_entries=int(os.getenv("RESULT_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("RESULT_CACHE_TTL", str(24 * 3600))),
+    db_path=os.getenv("RESULT_CACHE_DB") or None,
+    max_disk_entries=int(os.getenv("RESULT_CACHE_DB_SIZE", "10000")),
+)
@@ -0,0 +1,142 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+
+class DocumentStore:
+    """Server-side store for uploaded documents, backed by SQLite.
+
+    Documents are keyed by doc_id (the hash of their exact text, since risk
+    hit offsets point into it) and hold the extracted text, sections and
+    risk hits, zlib-compressed, plus the normalized doc_hash used for
+    result cache keys. Section indexes are not stored; rebuilding one from
+    the sections takes a few milliseconds. A second table maps raw file
+    hashes to doc_ids so an identical re-upload skips extraction.
+
+    When the stored payload exceeds max_bytes the least recently used
+    documents are evicted, never the one just written. Reads record access
+    times in memory; they are written out with the next put (before
+    eviction looks at them) or every TOUCH_FLUSH reads, so a read does not
+    commit a transaction.
+    """
+
+    TOUCH_FLUSH = 64
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._touched: Dict[str, float] = {}
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # Opened on first use (always under _lock) so importing the app stays side-effect free
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " doc_id TEXT PRIMARY KEY, digest TEXT NOT NULL, text BLOB NOT NULL, sections BLOB NOT NULL,"
+                " risk_hits BLOB NOT NULL, size INTEGER NOT NULL,"
+                " accessed REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS files (file_hash TEXT PRIMARY KEY, doc_id TEXT NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS documents_accessed ON documents (accessed);"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _pack(obj) -> bytes:
+        return zlib.compress(json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+    @staticmethod
+    def _unpack(blob: bytes):
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+    def put(self, doc_id: str, digest: str, text: str, sections: List[Tuple[str, str]], risk_hits: List[dict],
+            file_hash: Optional[str] = None) -> None:
+        row = (self._pack(text), self._pack(sections), self._pack(risk_hits))
+        size = sum(len(b) for b in row)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents"
+                " (doc_id, digest, text, sections, risk_hits, size, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (doc_id, digest, *row, size, time.time()),
+            )
+            if file_hash:
+                self._db.execute("INSERT OR REPLACE INTO files (file_hash, doc_id) VALUES (?, ?)", (file_hash, doc_id))
+            self._flush_touches()
+            self._evict(keep=doc_id)
+            self._db.commit()
+
+    def _evict(self, keep: str) -> None:
+        # The document just written is kept even if it alone exceeds max_bytes:
+        # its doc_id has been handed to the client
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute(
+            "SELECT doc_id, size FROM documents WHERE doc_id != ? ORDER BY accessed", (keep,)
+        ).fetchall()
+        for doc_id, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+            self._db.execute("DELETE FROM files WHERE doc_id = ?", (doc_id,))
+            total -= size
+
+    def _touch(self, doc_id: str) -> None:
+        self._touched[doc_id] = time.time()
+        if len(self._touched) >= self.TOUCH_FLUSH:
+            self._flush_touches()
+            self._db.commit()
+
+    def _flush_touches(self) -> None:
+        if self._touched:
+            self._db.executemany("UPDATE documents SET accessed = ? WHERE doc_id = ?",
+                                 [(t, doc_id) for doc_id, t in self._touched.items()])
+            self._touched.clear()
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        """Text, digest, sections and risk hits for a stored document"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT text, sections, risk_hits, digest FROM documents WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touch(doc_id)
+        return {
+            "doc_id": doc_id,
+            "digest": row[3],
+            "text": self._unpack(row[0]),
+            "sections": [tuple(s) for s in self._unpack(row[1])],
+            "risk_hits": self._unpack(row[2]),
+        }
+
+    def get_text(self, doc_id: str) -> Optional[Tuple[str, str]]:
+        """(text, digest) for a stored document"""
+        with self._lock:
+            row = self._db.execute("SELECT text, digest FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+            if row is None:
+                return None
+            self._touch(doc_id)
+        return self._unpack(row[0]), row[1]
+
+    def lookup_file(self, file_hash: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT doc_id FROM files WHERE file_hash = ?", (file_hash,)).fetchone()
+        return row[0] if row else None
+
+
+# Global instance
+document_store = DocumentStore(
+    path=os.getenv("DOCSTORE_PATH", "documents.sqlite3"),
+    max_bytes=int(os.getenv("DOCSTORE_MAX_BYTES", str(512 * 1024 * 1024))),
+)
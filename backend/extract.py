@@ -1,35 +1,139 @@
-from typing import List, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from io import BytesIO
-from pypdf import PdfReader
-from docx import Document as DocxDocument
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import bisect
+import json
+import multiprocessing
+import os
 import re
+import threading
+
+from backend.metrics import stage
+
+HEADING_RE = re.compile(r"^(\d+(\.\d+)*)[.)\s-]+(.{3,})$|^(SECTION\s+\d+[:.\s-]+.*)$|^[A-Z][A-Z \-]{4,}$")
 
 RISK_KEYWORDS = ["penalty","arbitration","auto-renewal","late fee","indemnity","liability","termination","non-compete","confidentiality","jurisdiction","governing law","assignment","renewal","fees"]
 
+@stage("extract")
 def extract_text(file_bytes: bytes, filename: str) -> str:
     name = filename.lower()
     if name.endswith(".pdf"):
+        from pypdf import PdfReader
         reader = PdfReader(BytesIO(file_bytes))
         pages = []
         for p in reader.pages:
             pages.append(p.extract_text() or "")
         return "\n\n".join(pages)
     if name.endswith(".docx"):
+        from docx import Document as DocxDocument
         doc = DocxDocument(BytesIO(file_bytes))
         return "\n".join([p.text for p in doc.paragraphs])
     if name.endswith(".txt"):
         return file_bytes.decode("utf-8", errors="ignore")
     raise ValueError("Unsupported file type. Use PDF, DOCX, or TXT.")
 
+# Pages handed to each worker task; amortizes re-opening the PDF per task
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Not fork: the pool starts lazily inside a running server whose threads
+        # (to_thread workers, SQLite, httpx) may hold locks a forked child inherits
+        _pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS,
+                                    mp_context=multiprocessing.get_context("forkserver"))
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# pypdf and python-docx are imported where used: they are slow to import and
+# only needed once a document is uploaded (often only in pool workers)
+def _pdf_page_count(path: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+
+def _extract_pdf_pages(path: str, start: int, end: int) -> List[str]:
+    """Worker: extract pages [start, end) from the PDF at path"""
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def _extract_docx_file(path: str) -> str:
+    from docx import Document as DocxDocument
+    return "\n".join([p.text for p in DocxDocument(path).paragraphs])
+
+
+def _read_txt_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return f.read().decode("utf-8", errors="ignore")
+
+
+async def iter_file_pages(path: str, filename: str) -> AsyncIterator[str]:
+    """Yield a spooled document's text page by page, off the event loop.
+
+    PDF page ranges are extracted in parallel in a process pool and yielded
+    in order as they complete. DOCX and TXT have no pages and are yielded
+    whole from a worker thread.
+    """
+    name = filename.lower()
+    if name.endswith(".pdf"):
+        count = await asyncio.to_thread(_pdf_page_count, path)
+        if count <= PDF_PAGES_PER_TASK:
+            for page in await asyncio.to_thread(_extract_pdf_pages, path, 0, count):
+                yield page
+            return
+        loop = asyncio.get_running_loop()
+        pool = _get_pool()
+        futures = [
+            loop.run_in_executor(pool, _extract_pdf_pages, path, start, min(start + PDF_PAGES_PER_TASK, count))
+            for start in range(0, count, PDF_PAGES_PER_TASK)
+        ]
+        try:
+            for future in futures:
+                for page in await future:
+                    yield page
+        finally:
+            for future in futures:
+                future.cancel()
+        return
+    if name.endswith(".docx"):
+        yield await asyncio.to_thread(_extract_docx_file, path)
+        return
+    if name.endswith(".txt"):
+        yield await asyncio.to_thread(_read_txt_file, path)
+        return
+    raise ValueError("Unsupported file type. Use PDF, DOCX, or TXT.")
+
+
+async def extract_file(path: str, filename: str) -> str:
+    """Async, path-based counterpart of extract_text"""
+    with stage("extract"):
+        pages = [page async for page in iter_file_pages(path, filename)]
+    return "\n\n".join(pages)
+
+
+@stage("split_sections")
 def split_sections(text: str) -> List[Tuple[str,str]]:
     lines = text.splitlines()
     sections: List[Tuple[str,str]] = []
     current_title = "Preamble"
     buf = []
-    heading_re = re.compile(r"^(\d+(\.\d+)*)[.)\s-]+(.{3,})$|^(SECTION\s+\d+[:.\s-]+.*)$|^[A-Z][A-Z \-]{4,}$")
     for line in lines:
         s = line.strip()
-        if heading_re.match(s):
+        if HEADING_RE.match(s):
             if buf:
                 sections.append((current_title, "\n".join(buf).strip()))
                 buf = []
@@ -40,11 +144,143 @@ def split_sections(text: str) -> List[Tuple[str,str]]:
         sections.append((current_title, "\n".join(buf).strip()))
     return sections
 
+def section_starts(text: str) -> List[Tuple[int, str]]:
+    """(offset, heading) for every section split_sections would start"""
+    starts = [(0, "Preamble")]
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        s = line.strip()
+        if HEADING_RE.match(s):
+            starts.append((offset, s))
+        offset += len(line)
+    return starts
+
+
+# Word characters for boundary checks; \w alone misses Devanagari vowel signs
+_WORD_CHARS = r"\w\u0900-\u097F"
+_is_word_char = re.compile(rf"[{_WORD_CHARS}]").match
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """Regex for a set of words with shared prefixes factored out.
+
+    Each position in the text then costs one branch per distinct next
+    character rather than one attempt per keyword, and optional suffixes are
+    greedy so the longest keyword wins. Spaces match any whitespace run.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        alts = [
+            (r"\s+" if ch == " " else re.escape(ch)) + build(child)
+            for ch, child in sorted(node.items()) if ch
+        ]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class RiskScanner:
+    """Single-pass matcher for a weighted keyword list.
+
+    Keywords are compiled into one prefix-trie regex run over the lowercased
+    text, so adding terms barely changes the scan cost. Matches must sit on
+    Unicode-aware word boundaries on both sides.
+    """
+
+    def __init__(self, keywords: Dict[str, float]):
+        # Blank keywords would make the pattern match the empty string everywhere
+        self.weights = {" ".join(kw.lower().split()): float(w) for kw, w in keywords.items() if kw.strip()}
+        pattern = rf"(?:{_trie_pattern(list(self.weights)) or '(?!)'})(?![{_WORD_CHARS}])"
+        self._re = re.compile(pattern)
+        # For the rare text whose lowercase form changes length (e.g. "İ")
+        self._re_ci = re.compile(pattern, re.IGNORECASE)
+
+    def _matches(self, text: str):
+        """(start, end, keyword) for every boundary-correct occurrence"""
+        haystack, search = text.lower(), self._re.search
+        if len(haystack) != len(text):
+            haystack, search = text, self._re_ci.search
+        pos = 0
+        while True:
+            m = search(haystack, pos)
+            if m is None:
+                return
+            start = m.start()
+            if start and _is_word_char(haystack[start - 1]):
+                # Started mid-word; a keyword may still begin later in this span
+                pos = start + 1
+                continue
+            yield start, m.end(), " ".join(m.group().lower().split())
+            pos = max(m.end(), start + 1)
+
+    def scan(self, text: str) -> List[dict]:
+        """Every keyword occurrence with its offset, section and weight"""
+        starts = section_starts(text)
+        offsets = [o for o, _ in starts]
+        hits = []
+        for start, end, kw in self._matches(text):
+            hits.append({
+                "keyword": kw,
+                "offset": start,
+                "end": end,
+                "section": starts[bisect.bisect_right(offsets, start) - 1][1],
+                "weight": self.weights.get(kw, 1.0),
+            })
+        return hits
+
+    def first_hits(self, text: str) -> List[Tuple[str, int]]:
+        """(keyword, offset) of each keyword's first occurrence"""
+        seen: Dict[str, int] = {}
+        for start, _, kw in self._matches(text):
+            seen.setdefault(kw, start)
+        return list(seen.items())
+
+
+def load_risk_keywords() -> Dict[str, float]:
+    """Default keywords at weight 1.0, overridden/extended by RISK_KEYWORDS_FILE (JSON term -> weight)"""
+    keywords = {kw: 1.0 for kw in RISK_KEYWORDS}
+    path = os.getenv("RISK_KEYWORDS_FILE")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            keywords.update(json.load(f))
+    return keywords
+
+
+_risk_scanner: Optional[RiskScanner] = None
+_risk_scanner_lock = threading.Lock()
+
+
+def get_risk_scanner() -> RiskScanner:
+    """Shared scanner, built on first use so RISK_KEYWORDS_FILE is read then, not at import"""
+    global _risk_scanner
+    with _risk_scanner_lock:
+        if _risk_scanner is None:
+            _risk_scanner = RiskScanner(load_risk_keywords())
+        return _risk_scanner
+
+
+@stage("risk_scan")
+def scan_risks(text: str) -> List[dict]:
+    return get_risk_scanner().scan(text)
+
+
+def first_occurrences(hits: List[dict]) -> List[Tuple[str, int]]:
+    """Collapse scan_risks output to highlight_risks' (keyword, offset) form"""
+    seen: Dict[str, int] = {}
+    for h in hits:
+        seen.setdefault(h["keyword"], h["offset"])
+    return list(seen.items())
+
+
+@stage("risk_scan")
 def highlight_risks(text: str):
-    hits = []
-    lower = text.lower()
-    for kw in RISK_KEYWORDS:
-        idx = lower.find(kw)
-        if idx != -1:
-            hits.append((kw, idx))
-    return hits
+    return get_risk_scanner().first_hits(text)
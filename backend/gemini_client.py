@@ -1,31 +1,46 @@
-import google.generativeai as genai
 import os
-from dotenv import load_dotenv
-from typing import Optional
-
-# Load environment variables
-load_dotenv()
+import asyncio
+import threading
+from typing import AsyncIterator, Optional
+from backend.prompts import ENHANCE_SUMMARY_PROMPT, RISK_ANALYSIS_PROMPT, TRANSLATE_HINDI_PROMPT
 
 class GeminiClient:
-    def __init__(self):  # Fixed: double underscores
-        # Try both environment variable names
-        self.api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
-        
-        print(f"🔍 Loading Google AI API key: {self.api_key[:10] if self.api_key else 'None'}...")
-        
-        if self.api_key:
-            try:
-                genai.configure(api_key=self.api_key)
-                self.model = genai.GenerativeModel('gemini-1.5-flash')  # Free model
-                self.available = True
-                print("✅ Google AI initialized successfully")
-            except Exception as e:
-                print(f"❌ Google AI initialization failed: {e}")
-                self.available = False
-        else:
-            print("❌ No Google AI API key found in environment variables")
-            self.available = False
-    
+    """Google AI SDK client. The SDK (and its grpc stack) is imported and
+    configured on first use, so importing this module is cheap and side-effect free."""
+
+    def __init__(self):
+        self.model = None
+        self._available: Optional[bool] = None
+        self._lock = threading.Lock()
+
+    def _init(self) -> bool:
+        with self._lock:
+            if self._available is not None:
+                return self._available
+            # Try both environment variable names
+            self.api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+
+            print(f"🔍 Loading Google AI API key: {self.api_key[:10] if self.api_key else 'None'}...")
+
+            if self.api_key:
+                try:
+                    import google.generativeai as genai
+                    genai.configure(api_key=self.api_key)
+                    self.model = genai.GenerativeModel('gemini-1.5-flash')  # Free model
+                    self._available = True
+                    print("✅ Google AI initialized successfully")
+                except Exception as e:
+                    print(f"❌ Google AI initialization failed: {e}")
+                    self._available = False
+            else:
+                print("❌ No Google AI API key found in environment variables")
+                self._available = False
+            return self._available
+
+    @property
+    def available(self) -> bool:
+        return self._init()
+
     def enhance_summary(self, text: str) -> Optional[str]:
         """Use Google Gemini to enhance/validate Ollama summary"""
         if not self.available:
@@ -33,12 +48,7 @@ class GeminiClient:
             return None
         
         try:
-            prompt = f"""Review this contract summary and add any important legal points that might be missing. Keep it concise:
-
-Original Summary:
-{text}
-
-Enhanced Summary (add missing key legal points):"""
+            prompt = ENHANCE_SUMMARY_PROMPT.format(content=text)
             
             response = self.model.generate_content(prompt)
             print("✅ Summary enhanced successfully")
@@ -54,12 +64,7 @@ Enhanced Summary (add missing key legal points):"""
             return None
         
         try:
-            prompt = f"""Analyze this legal text and identify TOP 3 RISKS in bullet points:
-
-Legal Text:
-{text[:3000]}
-
-Risk Analysis (3 bullet points max):"""
+            prompt = RISK_ANALYSIS_PROMPT.format(content=text[:3000])
             
             response = self.model.generate_content(prompt)
             print("✅ Risk analysis completed successfully")
@@ -75,12 +80,7 @@ Risk Analysis (3 bullet points max):"""
             return None
         
         try:
-            prompt = f"""Translate this legal text to Hindi, keeping legal terms accurate:
-
-English Text:
-{text}
-
-Hindi Translation:"""
+            prompt = TRANSLATE_HINDI_PROMPT.format(content=text)
             
             response = self.model.generate_content(prompt)
             print("✅ Hindi translation completed successfully")
@@ -89,5 +89,59 @@ Hindi Translation:"""
             print(f"❌ Translation failed: {e}")
             return None
 
+    async def agenerate(self, prompt: str, options: Optional[dict] = None) -> str:
+        """Generate off the event loop; raises instead of returning None so callers can fall back"""
+        # First use imports the SDK; keep that off the event loop
+        if not await asyncio.to_thread(self._init):
+            raise RuntimeError("Google AI not available")
+
+        response = await asyncio.to_thread(
+            self.model.generate_content, prompt, generation_config=_generation_config(options)
+        )
+        return response.text.strip()
+
+    async def astream(self, prompt: str, options: Optional[dict] = None) -> AsyncIterator[str]:
+        """Yield Gemini output chunks as they are generated; blocking SDK reads run off the event loop"""
+        if not await asyncio.to_thread(self._init):
+            raise RuntimeError("Google AI not available")
+
+        response = await asyncio.to_thread(
+            self.model.generate_content, prompt, stream=True, generation_config=_generation_config(options)
+        )
+        chunks = iter(response)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                if chunk.text:
+                    yield chunk.text
+        finally:
+            # Runs on client disconnect too, so upstream generation stops
+            _cancel_stream(response)
+
+
+def _generation_config(options: Optional[dict]) -> dict:
+    """Map the Ollama-style options used across the backend to SDK generation_config"""
+    config = {}
+    if options:
+        if "temperature" in options:
+            config["temperature"] = options["temperature"]
+        if "num_predict" in options:
+            config["max_output_tokens"] = options["num_predict"]
+    return config
+
+
+def _cancel_stream(response) -> None:
+    """Cancel the gRPC stream behind a streaming GenerateContentResponse, if still open"""
+    # _iterator is SDK-private; if a release drops or renames it this silently
+    # does nothing and the upstream generation runs to completion
+    cancel = getattr(getattr(response, "_iterator", None), "cancel", None)
+    if cancel is not None:
+        try:
+            cancel()
+        except Exception:
+            pass
+
 # Global instance
 gemini_client = GeminiClient()
@@ -0,0 +1,208 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+# Seconds; spans in-process stages (sub-millisecond) up to slow LLM calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Bytes; 256B to 64MB in powers of four
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(10))
+TOKEN_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536)
+
+# Rough chars-per-token ratio used where providers don't report usage
+CHARS_PER_TOKEN = 4
+
+# Requests may ask for a timing breakdown with the X-Profile: 1 header
+PROFILING_ENABLED = os.getenv("METRICS_PROFILING", "1") not in ("0", "false", "False")
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+HELP = {
+    "http_request_seconds": ("histogram", "HTTP request latency, to the last body byte"),
+    "http_request_bytes": ("histogram", "HTTP request body size"),
+    "http_response_bytes": ("histogram", "HTTP response body size"),
+    "stage_seconds": ("histogram", "Latency of one pipeline stage"),
+    "llm_request_seconds": ("histogram", "Latency of one provider attempt"),
+    "llm_first_token_seconds": ("histogram", "Time to the first streamed token"),
+    "llm_prompt_tokens": ("histogram", "Prompt size per provider attempt, estimated from characters"),
+    "llm_tokens_total": ("counter", "Prompt and output tokens, estimated from characters"),
+    "llm_errors_total": ("counter", "Failed provider attempts"),
+    "llm_hedges_total": ("counter", "Hedged requests started because a provider ran past its p95"),
+    "analysis_cache_total": ("counter", "Analysis result cache lookups"),
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Metrics:
+    """In-process counters and histograms, rendered in Prometheus text format.
+
+    Series are keyed by metric name plus labels. Histograms keep cumulative
+    bucket counts, a sum and a count, so they aggregate across workers the
+    usual way (histogram_quantile over rate()).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, list]] = {}
+        self._buckets: Dict[str, tuple] = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = _key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: tuple = LATENCY_BUCKETS, **labels) -> None:
+        key = _key(labels)
+        with self._lock:
+            self._buckets.setdefault(name, buckets)
+            series = self._histograms.setdefault(name, {})
+            # [per-bucket counts..., +Inf count, sum]
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0] * (len(self._buckets[name]) + 1) + [0.0]
+            for i, bound in enumerate(self._buckets[name]):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines += self._header(name, "counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_fmt_labels(key)} {value:g}")
+            for name in sorted(self._histograms):
+                lines += self._header(name, "histogram")
+                bounds = self._buckets[name]
+                for key, state in sorted(self._histograms[name].items()):
+                    for bound, count in zip(bounds, state):
+                        lines.append(f"{name}_bucket{_fmt_labels(key, ('le', f'{bound:g}'))} {count}")
+                    lines.append(f"{name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {state[-2]}")
+                    lines.append(f"{name}_sum{_fmt_labels(key)} {state[-1]:g}")
+                    lines.append(f"{name}_count{_fmt_labels(key)} {state[-2]}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _header(name: str, kind: str) -> list:
+        kind, text = HELP.get(name, (kind, name))
+        return [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+
+
+# Timing breakdown for the current request when profiling was asked for;
+# maps stage -> [total seconds, calls]. Copied into worker threads by to_thread.
+_profile: contextvars.ContextVar[Optional[Dict[str, list]]] = contextvars.ContextVar("profile", default=None)
+
+
+def start_profile() -> Dict[str, list]:
+    profile: Dict[str, list] = {}
+    _profile.set(profile)
+    return profile
+
+
+def current_profile() -> Optional[Dict[str, list]]:
+    return _profile.get()
+
+
+def record_stage(name: str, seconds: float) -> None:
+    metrics.observe("stage_seconds", seconds, stage=name)
+    profile = _profile.get()
+    if profile is not None:
+        entry = profile.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block as a pipeline stage (histogram, plus the request profile if any).
+
+    Also usable as a decorator on plain functions.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def profile_summary(profile: Dict[str, list]) -> Dict[str, dict]:
+    return {name: {"ms": round(total * 1000, 2), "calls": calls} for name, (total, calls) in profile.items()}
+
+
+def server_timing(profile: Dict[str, list]) -> str:
+    return ", ".join(f'{name.replace(":", "-")};dur={total * 1000:.2f};desc="x{calls}"'
+                     for name, (total, calls) in profile.items())
+
+
+class MetricsMiddleware:
+    """ASGI middleware: request latency and payload sizes per route.
+
+    With X-Profile: 1 the request's stage breakdown is returned in a
+    Server-Timing header (stages finished before the response starts;
+    streaming endpoints add the rest to their final event).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        profile = None
+        if PROFILING_ENABLED and (b"x-profile", b"1") in scope.get("headers", []):
+            profile = start_profile()
+        sizes = {"request": 0, "response": 0}
+        status = {"code": 500}
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes["request"] += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if profile:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", server_timing(profile).encode("latin-1"))]
+            elif message["type"] == "http.response.body":
+                sizes["response"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            labels = {"method": scope["method"], "route": route}
+            metrics.observe("http_request_seconds", time.perf_counter() - started, status=status["code"], **labels)
+            metrics.observe("http_request_bytes", sizes["request"], buckets=SIZE_BUCKETS, **labels)
+            metrics.observe("http_response_bytes", sizes["response"], buckets=SIZE_BUCKETS, **labels)
+
+
+# Global instance
+metrics = Metrics()
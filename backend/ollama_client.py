@@ -1,17 +1,63 @@
 import os
-import requests
-from typing import Optional
+import json
+import asyncio
+import httpx
+from typing import AsyncIterator, Dict, Optional
 
-GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+GEMINI_URL = os.getenv("GEMINI_URL", "https://generativelanguage.googleapis.com/v1beta/models")
 GEMINI_MODEL = "gemini-1.5-flash-latest"
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "").strip()
 
-if not GEMINI_API_KEY:
-    raise ValueError("❌ GEMINI_API_KEY not set or empty in environment variables")
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
 
-def generate(prompt: str, options: Optional[dict] = None) -> str:
-    url = f"{GEMINI_URL}/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
+# Upper bound on generations in flight per backend and worker; also sizes each connection pool
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
 
+# Keep-alive client and concurrency limit per backend ("gemini", "ollama"),
+# created on first use inside the running event loop. Separate so a hung
+# backend can't take the slots or connections its fallback needs.
+_clients: Dict[str, httpx.AsyncClient] = {}
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def _get_client(backend: str) -> httpx.AsyncClient:
+    client = _clients.get(backend)
+    if client is None or client.is_closed:
+        client = _clients[backend] = httpx.AsyncClient(
+            headers={"Content-Type": "application/json"},
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONCURRENCY,
+                max_keepalive_connections=LLM_MAX_CONCURRENCY,
+                keepalive_expiry=30.0,
+            ),
+        )
+    return client
+
+
+def _api_key() -> str:
+    """Read per request so a missing key fails that call (and the router falls back), not the import"""
+    key = os.getenv("GEMINI_API_KEY", "").strip()
+    if not key:
+        raise RuntimeError("GEMINI_API_KEY not set or empty in environment variables")
+    return key
+
+
+def _get_semaphore(backend: str) -> asyncio.Semaphore:
+    semaphore = _semaphores.get(backend)
+    if semaphore is None:
+        semaphore = _semaphores[backend] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return semaphore
+
+
+def _gemini_headers() -> dict:
+    # Key goes in a header: httpx error messages include the URL, and those
+    # end up in API error details and logs
+    return {"x-goog-api-key": _api_key()}
+
+
+def build_payload(prompt: str, options: Optional[dict] = None) -> dict:
     payload = {
         "contents": [
             {"parts": [{"text": prompt}]}
@@ -27,16 +73,78 @@ def generate(prompt: str, options: Optional[dict] = None) -> str:
         if generation_config:
             payload["generationConfig"] = generation_config
 
-    headers = {"Content-Type": "application/json"}
+    return payload
 
-    resp = requests.post(url, headers=headers, json=payload, timeout=60)
-    resp.raise_for_status()
-    data = resp.json()
 
+def parse_text(data: dict) -> str:
     return (
         data.get("candidates", [{}])[0]
         .get("content", {})
         .get("parts", [{}])[0]
         .get("text", "")
-        .strip()
     )
+
+
+async def generate(prompt: str, options: Optional[dict] = None) -> str:
+    url = f"{GEMINI_URL}/{GEMINI_MODEL}:generateContent"
+    payload = build_payload(prompt, options)
+
+    async with _get_semaphore("gemini"):
+        resp = await _get_client("gemini").post(url, json=payload, headers=_gemini_headers())
+    resp.raise_for_status()
+    return parse_text(resp.json()).strip()
+
+
+async def stream_generate(prompt: str, options: Optional[dict] = None) -> AsyncIterator[str]:
+    """Yield text deltas from streamGenerateContent as they arrive.
+
+    Closing the generator (or cancelling the task consuming it) exits the
+    stream context, which drops the upstream connection and stops generation.
+    """
+    url = f"{GEMINI_URL}/{GEMINI_MODEL}:streamGenerateContent?alt=sse"
+    payload = build_payload(prompt, options)
+
+    async with _get_semaphore("gemini"):
+        async with _get_client("gemini").stream("POST", url, json=payload, headers=_gemini_headers()) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                text = parse_text(json.loads(line[5:]))
+                if text:
+                    yield text
+
+
+async def ollama_generate(prompt: str, options: Optional[dict] = None) -> str:
+    """Generate with a local Ollama model; options (temperature, num_predict) pass through"""
+    payload = {"model": OLLAMA_MODEL, "prompt": prompt, "stream": False, "options": options or {}}
+
+    async with _get_semaphore("ollama"):
+        resp = await _get_client("ollama").post(f"{OLLAMA_URL}/api/generate", json=payload)
+    resp.raise_for_status()
+    return resp.json().get("response", "").strip()
+
+
+async def ollama_stream_generate(prompt: str, options: Optional[dict] = None) -> AsyncIterator[str]:
+    """Yield text deltas from Ollama's NDJSON stream; closing the generator aborts it"""
+    payload = {"model": OLLAMA_MODEL, "prompt": prompt, "stream": True, "options": options or {}}
+
+    async with _get_semaphore("ollama"):
+        async with _get_client("ollama").stream("POST", f"{OLLAMA_URL}/api/generate", json=payload) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("response"):
+                    yield data["response"]
+                if data.get("done"):
+                    break
+
+
+async def aclose() -> None:
+    """Close pooled connections (called on app shutdown)"""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
@@ -13,10 +13,46 @@ Then add one line starting with 'Risk note:' if any risk keywords appear (penalt
 
 QA_PROMPT = """Answer the user's question using only the provided contract text.
 If the answer is not present, reply exactly: Not in document.
-When possible, mention the nearest section heading.
+When possible, mention the nearest section heading (shown in [brackets]).
 ---
-Contract:
+Contract (relevant sections):
 {content}
 ---
 Question: {question}
 Answer:"""
+
+SECTION_SUMMARY_PROMPT = """You are a legal assistant. Summarize these contract sections in at most 4 short bullets.
+Keep parties, dates, amounts, obligations, termination and dispute terms; drop boilerplate.
+Prefix each bullet with its section heading in [brackets].
+---
+{content}
+"""
+
+REDUCE_PROMPT = """You are a legal assistant. Below are summaries of consecutive parts of one contract.
+Combine them into 5 concise bullets for a layperson.
+Include: parties, effective date/term, payment/fees, termination, dispute resolution.
+Output only bullets.
+---
+{content}
+"""
+
+ENHANCE_SUMMARY_PROMPT = """Review this contract summary and add any important legal points that might be missing. Keep it concise:
+
+Original Summary:
+{content}
+
+Enhanced Summary (add missing key legal points):"""
+
+RISK_ANALYSIS_PROMPT = """Analyze this legal text and identify TOP 3 RISKS in bullet points:
+
+Legal Text:
+{content}
+
+Risk Analysis (3 bullet points max):"""
+
+TRANSLATE_HINDI_PROMPT = """Translate this legal text to Hindi, keeping legal terms accurate:
+
+English Text:
+{content}
+
+Hindi Translation:"""
@@ -0,0 +1,124 @@
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import List, Optional, Tuple
+
+from backend.cache import doc_hash
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Long sections are split into passages of roughly this many characters
+CHUNK_CHARS = 2000
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def chunk_sections(sections: List[Tuple[str, str]], max_chars: int = CHUNK_CHARS) -> List[Tuple[str, str]]:
+    """Split oversized sections on paragraph boundaries, keeping their heading"""
+    chunks: List[Tuple[str, str]] = []
+    for title, body in sections:
+        if len(body) <= max_chars:
+            if body or title:
+                chunks.append((title, body))
+            continue
+        buf = ""
+        for para in re.split(r"\n\s*\n", body):
+            if buf and len(buf) + len(para) > max_chars:
+                chunks.append((title, buf.strip()))
+                buf = ""
+            while len(para) > max_chars:
+                chunks.append((title, para[:max_chars]))
+                para = para[max_chars:]
+            buf = f"{buf}\n\n{para}" if buf else para
+        if buf.strip():
+            chunks.append((title, buf.strip()))
+    return chunks
+
+
+class SectionIndex:
+    """Okapi BM25 over document sections; headings count double"""
+
+    def __init__(self, sections: List[Tuple[str, str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.chunks = chunk_sections(sections)
+        self._tfs: List[Counter] = []
+        self._lens: List[int] = []
+        df: Counter = Counter()
+        for title, body in self.chunks:
+            tokens = tokenize(title) * 2 + tokenize(body)
+            tf = Counter(tokens)
+            self._tfs.append(tf)
+            self._lens.append(len(tokens))
+            df.update(tf.keys())
+        n = len(self.chunks)
+        self._avg_len = (sum(self._lens) / n) if n else 0.0
+        self._idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[str, str]]:
+        """Top-k chunks for the query, returned in document order"""
+        terms = [t for t in set(tokenize(query)) if t in self._idf]
+        if not terms or not self.chunks:
+            return self.chunks[:k]
+        scores = []
+        for i, tf in enumerate(self._tfs):
+            norm = self.k1 * (1 - self.b + self.b * self._lens[i] / (self._avg_len or 1))
+            score = 0.0
+            for t in terms:
+                f = tf.get(t)
+                if f:
+                    score += self._idf[t] * f * (self.k1 + 1) / (f + norm)
+            if score > 0:
+                scores.append((score, i))
+        top = sorted(scores, reverse=True)[:k]
+        if not top:
+            return self.chunks[:k]
+        return [self.chunks[i] for _, i in sorted(top, key=lambda s: s[1])]
+
+
+def format_context(chunks: List[Tuple[str, str]]) -> str:
+    return "\n\n".join(f"[{title}]\n{body}" for title, body in chunks)
+
+
+class IndexRegistry:
+    """Per-document indexes keyed by content hash, LRU-bounded"""
+
+    def __init__(self, max_docs: int = 64):
+        self.max_docs = max_docs
+        self._indexes: "OrderedDict[str, SectionIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key: str, index: SectionIndex) -> None:
+        with self._lock:
+            self._indexes[key] = index
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_docs:
+                self._indexes.popitem(last=False)
+
+    def get(self, key: str) -> Optional[SectionIndex]:
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+            return index
+
+    def build(self, text: str, sections: List[Tuple[str, str]]) -> str:
+        key = doc_hash(text)
+        self.put(key, SectionIndex(sections))
+        return key
+
+    def get_or_build(self, text: str, sections_fn, digest: Optional[str] = None) -> SectionIndex:
+        key = digest or doc_hash(text)
+        index = self.get(key)
+        if index is None:
+            index = SectionIndex(sections_fn(text))
+        self.put(key, index)
+        return index
+
+
+# Global instance
+index_registry = IndexRegistry(max_docs=int(os.getenv("RETRIEVAL_MAX_DOCS", "64")))
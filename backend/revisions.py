@@ -0,0 +1,164 @@
+import asyncio
+import difflib
+import hashlib
+from typing import List, Optional
+
+from backend.admission import MODE_PRIORITY
+from backend.analysis import text_generator
+from backend.extract import get_risk_scanner, section_starts
+from backend.metrics import stage
+from backend.router import provider_router
+from backend.summarize import summarize_sections
+
+
+def section_records(text: str) -> List[dict]:
+    """Sections as spans of text, each keyed by a hash of its body.
+
+    A span runs from its heading line (the same headings split_sections
+    uses) to the next one. The heading is left out of the hash, so a clause
+    that was only renumbered by an insertion above it still matches.
+    """
+    starts = section_starts(text)
+    records = []
+    for i, (start, title) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else len(text)
+        # Preamble has no heading line; every other span starts with one
+        body_start = start if i == 0 else text.find("\n", start, end) + 1 or end
+        records.append({
+            "title": title,
+            "start": start,
+            "body_start": body_start,
+            "end": end,
+            "hash": hashlib.sha256(text[body_start:end].encode("utf-8")).hexdigest(),
+        })
+    return records
+
+
+def section_body(text: str, record: dict) -> str:
+    return text[record["body_start"]:record["end"]].strip()
+
+
+@stage("section_diff")
+def diff_sections(old_text: str, new_text: str) -> dict:
+    """Section-level diff between two versions of a document.
+
+    Returns the records of both versions plus index pairs into them:
+    unchanged (same body), modified (same heading, new body), and the
+    added/removed sections that could not be paired.
+    """
+    old, new = section_records(old_text), section_records(new_text)
+    matcher = difflib.SequenceMatcher(None, [r["hash"] for r in old], [r["hash"] for r in new], autojunk=False)
+    diff = {"old": old, "new": new, "unchanged": [], "modified": [], "added": [], "removed": []}
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            diff["unchanged"] += list(zip(range(i1, i2), range(j1, j2)))
+            continue
+        # Pair rewritten clauses by heading; anything left over was added or removed
+        old_by_title = {old[i]["title"]: i for i in range(i1, i2)}
+        paired = set()
+        for j in range(j1, j2):
+            i = old_by_title.get(new[j]["title"])
+            if i is not None and i not in paired:
+                paired.add(i)
+                diff["modified"].append((i, j))
+            else:
+                diff["added"].append(j)
+        diff["removed"] += [i for i in range(i1, i2) if i not in paired]
+    return diff
+
+
+def hits_in(hits: List[dict], record: dict) -> List[dict]:
+    return [h for h in hits if record["start"] <= h["offset"] < record["end"]]
+
+
+def _scan_span(text: str, start: int, end: int) -> List[dict]:
+    # Spans start at a line start and end before a heading line, so word
+    # boundaries (and the section each hit falls in) match a full scan
+    hits = get_risk_scanner().scan(text[start:end])
+    for h in hits:
+        h["offset"] += start
+        h["end"] += start
+    return hits
+
+
+@stage("risk_scan")
+def incremental_risk_hits(old_hits: List[dict], new_text: str, diff: dict) -> List[dict]:
+    """Risk hits for new_text, rescanning only sections whose body changed.
+
+    Hits in unchanged bodies are carried over from old_hits, shifted to
+    their new offsets; heading lines are always rescanned since renumbering
+    may have changed them.
+    """
+    reuse = {j: diff["old"][i] for i, j in diff["unchanged"]}
+    hits: List[dict] = []
+    for j, record in enumerate(diff["new"]):
+        old = reuse.get(j)
+        if old is None:
+            hits += _scan_span(new_text, record["start"], record["end"])
+            continue
+        hits += _scan_span(new_text, record["start"], record["body_start"])
+        shift = record["body_start"] - old["body_start"]
+        for h in old_hits:
+            if old["body_start"] <= h["offset"] < old["end"]:
+                hits.append({**h, "offset": h["offset"] + shift, "end": h["end"] + shift, "section": record["title"]})
+    return hits
+
+
+def risk_score(hits: List[dict]) -> float:
+    return round(sum(h["weight"] for h in hits), 2)
+
+
+def revision_overview(diff: dict, old_hits: List[dict], new_hits: List[dict],
+                      previous_doc_id: Optional[str] = None) -> dict:
+    """Compact, LLM-free description of what changed between two uploads"""
+    old, new = diff["old"], diff["new"]
+    return {
+        "previous_doc_id": previous_doc_id,
+        "unchanged": len(diff["unchanged"]),
+        "modified": [new[j]["title"] for _, j in diff["modified"]],
+        "added": [new[j]["title"] for j in diff["added"]],
+        "removed": [old[i]["title"] for i in diff["removed"]],
+        "risk_score_delta": round(risk_score(new_hits) - risk_score(old_hits), 2),
+    }
+
+
+async def analyze_revision(previous: dict, current: dict, provider: Optional[str] = None) -> dict:
+    """Delta between two stored versions of a document.
+
+    Only added and modified sections are summarized (one cached LLM call
+    each); their risk hits come from the stored scan of the new version.
+    """
+    # Hashing every section and matching them is CPU-bound; keep it off the event loop
+    diff = await asyncio.to_thread(diff_sections, previous["text"], current["text"])
+    old, new = diff["old"], diff["new"]
+    changed = sorted([(j, i) for i, j in diff["modified"]] + [(j, None) for j in diff["added"]])
+    # Heading-only sections have nothing to summarize
+    changed = [(j, i) for j, i in changed if section_body(current["text"], new[j])]
+    summaries, served = await summarize_sections(
+        [(new[j]["title"], section_body(current["text"], new[j])) for j, _ in changed],
+        text_generator(provider, MODE_PRIORITY["summarize"]), provider_router.model_tag(provider),
+    )
+
+    sections = []
+    for (j, i), summary in zip(changed, summaries):
+        entry = {
+            "title": new[j]["title"],
+            "status": "added" if i is None else "modified",
+            "summary": summary,
+            "risk_hits": hits_in(current["risk_hits"], new[j]),
+        }
+        if i is not None:
+            entry["previous_risk_hits"] = hits_in(previous["risk_hits"], old[i])
+        sections.append(entry)
+    removed = [{"title": old[i]["title"], "risk_hits": hits_in(previous["risk_hits"], old[i])}
+               for i in diff["removed"]]
+
+    return {
+        **revision_overview(diff, previous["risk_hits"], current["risk_hits"], previous["doc_id"]),
+        "doc_id": current["doc_id"],
+        "sections": sections,
+        "removed_sections": removed,
+        # Whichever providers actually wrote the summaries (cache hits count as the preferred one)
+        "powered_by": ", ".join(sorted({p.label for p in provider_router.providers if p.tag in served}))
+                      or provider_router.label(provider),
+    }
@@ -0,0 +1,403 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from backend.admission import PRIORITY_DEFAULT, AdmissionController, Overloaded
+from backend.admission import admission as default_admission
+from backend.metrics import TOKEN_BUCKETS, estimate_tokens, metrics, record_stage
+
+# Hedge a second provider once the first has run past its p95 latency
+LLM_HEDGE = os.getenv("LLM_HEDGE", "1") not in ("0", "false", "False")
+# Hedge delay used until a provider has enough latency samples for a p95
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "8"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Per-attempt deadline, well under the client's own timeout so fallback has time to run
+LLM_PROVIDER_TIMEOUT = float(os.getenv("LLM_PROVIDER_TIMEOUT", "30"))
+# Circuit breaker: open after this many consecutive failures, retry after the cooldown
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+GenerateFn = Callable[..., Awaitable[str]]
+StreamFn = Callable[..., AsyncIterator[str]]
+
+
+class Provider:
+    """One LLM backend plus its rolling health: latencies, error counts and breaker state"""
+
+    def __init__(self, name: str, label: str, model: str, generate: GenerateFn,
+                 stream: Optional[StreamFn] = None, timeout: float = LLM_PROVIDER_TIMEOUT,
+                 close: Optional[Callable[[], Awaitable[None]]] = None):
+        self.name = name
+        self.label = label
+        self.model = model
+        self.generate = generate
+        self.stream = stream
+        self.timeout = timeout
+        self.close = close
+        self.latencies: deque = deque(maxlen=200)
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.hedged = 0
+        self.open_until = 0.0
+        self._probing = False
+
+    @property
+    def tag(self) -> str:
+        """Cache-key component naming this provider and model"""
+        return f"{self.name}:{self.model}"
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def available(self, now: float) -> bool:
+        if not self.open_until:
+            return True
+        if now < self.open_until:
+            return False
+        # Half-open: let a single probe through
+        return not self._probing
+
+    def begin(self, now: float) -> bool:
+        """Claim a call; False while open or while another call holds the half-open probe.
+
+        Check and claim happen in one step, so concurrent requests can't all
+        see the breaker half-open and each send a probe.
+        """
+        if not self.available(now):
+            return False
+        self._probing = bool(self.open_until)
+        return True
+
+    def release_probe(self, probe: bool) -> None:
+        # The claimed call never finished against the provider (shed or cancelled)
+        if probe:
+            self._probing = False
+
+    def record_success(self, latency: Optional[float] = None) -> None:
+        if latency is not None:
+            self.latencies.append(latency)
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.consecutive_failures += 1
+        self._probing = False
+        if self.consecutive_failures >= LLM_BREAKER_FAILURES:
+            self.open_until = time.monotonic() + LLM_BREAKER_COOLDOWN
+
+    def stats(self) -> dict:
+        p95 = self.p95()
+        total = self.successes + self.failures
+        return {
+            "model": self.model,
+            "successes": self.successes,
+            "failures": self.failures,
+            "error_rate": round(self.failures / total, 4) if total else 0.0,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "hedged": self.hedged,
+            "breaker": "open" if self.open_until and time.monotonic() < self.open_until
+                       else "half-open" if self.open_until else "closed",
+        }
+
+
+def _describe(provider: Provider, exc: BaseException) -> str:
+    return f"{provider.name}: {str(exc) or type(exc).__name__}"
+
+
+def _error_kind(exc: BaseException) -> str:
+    return "timeout" if isinstance(exc, asyncio.TimeoutError) else "error"
+
+
+def _token_cost(prompt: str, options: Optional[dict]) -> int:
+    """Budgeted tokens for a call: the prompt plus the most it may generate"""
+    return estimate_tokens(prompt) + int((options or {}).get("num_predict", 0))
+
+
+def _record_call(provider: Provider, prompt: str, output: str, started: float, outcome: str) -> None:
+    """Latency, token and error metrics for one provider attempt"""
+    elapsed = time.perf_counter() - started
+    metrics.observe("llm_request_seconds", elapsed, provider=provider.name, outcome=outcome)
+    record_stage(f"llm:{provider.name}", elapsed)
+    prompt_tokens = estimate_tokens(prompt)
+    metrics.observe("llm_prompt_tokens", prompt_tokens, buckets=TOKEN_BUCKETS, provider=provider.name)
+    metrics.inc("llm_tokens_total", prompt_tokens, provider=provider.name, kind="prompt")
+    if output:
+        metrics.inc("llm_tokens_total", estimate_tokens(output), provider=provider.name, kind="output")
+    if outcome in ("error", "timeout"):
+        metrics.inc("llm_errors_total", provider=provider.name, kind=outcome)
+
+
+class ProviderRouter:
+    """Routes generations across providers.
+
+    The preferred (or first configured) healthy provider is tried first. If
+    it is still running past its p95 latency, the next provider is hedged in
+    and the first success wins. Failures fall through to the remaining
+    providers, and providers that keep failing are skipped by their breaker.
+
+    Providers may be given directly or as registry names; named providers
+    are built on first use, so an SDK is only imported once it is needed.
+    """
+
+    def __init__(self, providers: Optional[List[Provider]] = None, names: Sequence[str] = (),
+                 hedge: bool = LLM_HEDGE, hedge_after: float = LLM_HEDGE_AFTER,
+                 admission: AdmissionController = default_admission):
+        unknown = [name for name in names if name not in PROVIDER_FACTORIES]
+        if unknown:
+            raise ValueError(f"unknown LLM provider: {', '.join(unknown)}")
+        self._providers = providers
+        self.names = list(names)
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.admission = admission
+
+    @property
+    def providers(self) -> List[Provider]:
+        if self._providers is None:
+            self._providers = [build_provider(name) for name in self.names]
+        return self._providers
+
+    @providers.setter
+    def providers(self, providers: List[Provider]) -> None:
+        self._providers = providers
+
+    def _ordered(self, prefer: Optional[str]) -> List[Provider]:
+        return sorted(self.providers, key=lambda p: p.name != prefer)
+
+    def _candidates(self, prefer: Optional[str]) -> List[Provider]:
+        now = time.monotonic()
+        return [p for p in self._ordered(prefer) if p.available(now)]
+
+    def preferred(self, prefer: Optional[str] = None) -> Provider:
+        """The provider a request tries first when every breaker is closed"""
+        return self._ordered(prefer)[0]
+
+    def model_tag(self, prefer: Optional[str] = None) -> str:
+        """Stable cache-key component for the provider a request prefers"""
+        return self.preferred(prefer).tag
+
+    def label(self, prefer: Optional[str] = None) -> str:
+        return self.preferred(prefer).label
+
+    async def _attempt(self, provider: Provider, prompt: str, options: Optional[dict], priority: int,
+                       admitted: Optional[asyncio.Event] = None) -> str:
+        if not provider.begin(time.monotonic()):
+            raise RuntimeError("circuit open")
+        probe = provider._probing
+        try:
+            # Waits in the provider's queue or raises Overloaded; neither counts against the breaker
+            gate = await self.admission.acquire(provider.name, priority, _token_cost(prompt, options))
+        except BaseException:
+            provider.release_probe(probe)
+            raise
+        if admitted is not None:
+            admitted.set()
+        started = time.perf_counter()
+        try:
+            out = await asyncio.wait_for(provider.generate(prompt, options=options), timeout=provider.timeout)
+        except asyncio.CancelledError:
+            # Lost a hedge race; not the provider's fault
+            provider.release_probe(probe)
+            _record_call(provider, prompt, "", started, "cancelled")
+            raise
+        except Exception as e:
+            provider.record_failure()
+            _record_call(provider, prompt, "", started, _error_kind(e))
+            raise
+        finally:
+            gate.release(time.perf_counter() - started)
+        provider.record_success(time.perf_counter() - started)
+        _record_call(provider, prompt, out, started, "ok")
+        return out
+
+    async def generate(self, prompt: str, options: Optional[dict] = None, prefer: Optional[str] = None,
+                       priority: int = PRIORITY_DEFAULT) -> Tuple[str, Provider]:
+        candidates = self._candidates(prefer)
+        if not candidates:
+            raise RuntimeError("no healthy LLM provider (all circuit breakers open)")
+
+        pending = {}
+        errors: List[str] = []
+        overloaded: List[Overloaded] = []
+        launched = 0
+
+        def launch():
+            nonlocal launched
+            provider = candidates[launched]
+            launched += 1
+            admitted = asyncio.Event()
+            task = asyncio.ensure_future(self._attempt(provider, prompt, options, priority, admitted))
+            pending[task] = (provider, admitted)
+
+        launch()
+        try:
+            while pending:
+                delay = None
+                if self.hedge and len(pending) == 1 and launched < len(candidates):
+                    task, (running, admitted) = next(iter(pending.items()))
+                    if not admitted.is_set() and not task.done():
+                        # Still queued behind the provider's concurrency cap: the hedge
+                        # timer starts once it is admitted, so overload is shed rather
+                        # than spilled onto the next provider
+                        waiter = asyncio.ensure_future(admitted.wait())
+                        try:
+                            await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                        finally:
+                            waiter.cancel()
+                        continue
+                    delay = running.p95() or self.hedge_after
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    slow, _ = next(iter(pending.values()))
+                    slow.hedged += 1
+                    metrics.inc("llm_hedges_total", provider=slow.name)
+                    launch()
+                    continue
+                for task in done:
+                    provider, _ = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result(), provider
+                    errors.append(_describe(provider, task.exception()))
+                    if isinstance(task.exception(), Overloaded):
+                        overloaded.append(task.exception())
+                if not pending and launched < len(candidates):
+                    launch()
+            if overloaded and len(overloaded) == len(errors):
+                raise min(overloaded, key=lambda e: e.retry_after)
+            raise RuntimeError("all LLM providers failed: " + "; ".join(errors))
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream(self, prompt: str, options: Optional[dict] = None, prefer: Optional[str] = None,
+                     priority: int = PRIORITY_DEFAULT) -> AsyncIterator[Tuple[str, Provider]]:
+        """Yield (delta, provider). Falls back only until the first token arrives."""
+        errors: List[str] = []
+        overloaded: List[Overloaded] = []
+        for provider in self._candidates(prefer):
+            if provider.stream is None:
+                continue
+            if not provider.begin(time.monotonic()):
+                errors.append(f"{provider.name}: circuit open")
+                continue
+            probe = provider._probing
+            try:
+                # The slot is held for the whole stream
+                gate = await self.admission.acquire(provider.name, priority, _token_cost(prompt, options))
+            except Overloaded as e:
+                provider.release_probe(probe)
+                overloaded.append(e)
+                errors.append(_describe(provider, e))
+                continue
+            except BaseException:
+                provider.release_probe(probe)
+                raise
+            started = time.perf_counter()
+            stream = provider.stream(prompt, options=options)
+            output = []
+            outcome = "ok"
+            try:
+                try:
+                    first = await asyncio.wait_for(stream.__anext__(), timeout=provider.timeout)
+                except StopAsyncIteration:
+                    provider.record_success()
+                    return
+                except asyncio.CancelledError:
+                    provider.release_probe(probe)
+                    outcome = "cancelled"
+                    raise
+                except Exception as e:
+                    provider.record_failure()
+                    outcome = _error_kind(e)
+                    errors.append(_describe(provider, e))
+                    continue
+                provider.record_success()
+                metrics.observe("llm_first_token_seconds", time.perf_counter() - started, provider=provider.name)
+                output.append(first)
+                yield first, provider
+                async for delta in stream:
+                    output.append(delta)
+                    yield delta, provider
+                return
+            except (GeneratorExit, asyncio.CancelledError):
+                # Consumer stopped reading (client disconnect)
+                outcome = "cancelled"
+                raise
+            except Exception as e:
+                # Failed mid-stream; too late to fall back
+                outcome = _error_kind(e)
+                raise
+            finally:
+                await stream.aclose()
+                gate.release(time.perf_counter() - started)
+                _record_call(provider, prompt, "".join(output), started, outcome)
+        if overloaded and len(overloaded) == len(errors):
+            raise min(overloaded, key=lambda e: e.retry_after)
+        raise RuntimeError("all LLM providers failed: " + ("; ".join(errors) or "no streaming provider"))
+
+    def stats(self) -> dict:
+        return {p.name: {**p.stats(), "admission": self.admission.stats(p.name)} for p in self.providers}
+
+    async def aclose(self) -> None:
+        """Release provider resources; providers that were never built are left alone"""
+        closed = set()
+        for p in self._providers or []:
+            if p.close is not None and p.close not in closed:
+                closed.add(p.close)
+                await p.close()
+
+
+# Provider registry: name -> factory. Factories import their client module
+# when called, so providers that are never used are never imported.
+PROVIDER_FACTORIES: Dict[str, Callable[[], Provider]] = {}
+
+
+def register_provider(name: str):
+    def decorator(factory: Callable[[], Provider]) -> Callable[[], Provider]:
+        PROVIDER_FACTORIES[name] = factory
+        return factory
+    return decorator
+
+
+def build_provider(name: str) -> Provider:
+    try:
+        factory = PROVIDER_FACTORIES[name]
+    except KeyError:
+        raise ValueError(f"unknown LLM provider: {name}") from None
+    return factory()
+
+
+@register_provider("gemini")
+def _gemini() -> Provider:
+    from backend import ollama_client
+    return Provider("gemini", "Google Gemini AI", ollama_client.GEMINI_MODEL,
+                    ollama_client.generate, ollama_client.stream_generate, close=ollama_client.aclose)
+
+
+@register_provider("ollama")
+def _ollama() -> Provider:
+    from backend import ollama_client
+    return Provider("ollama", "Ollama", ollama_client.OLLAMA_MODEL,
+                    ollama_client.ollama_generate, ollama_client.ollama_stream_generate, close=ollama_client.aclose)
+
+
+@register_provider("gemini-sdk")
+def _gemini_sdk() -> Provider:
+    from backend.gemini_client import gemini_client
+    return Provider("gemini-sdk", "Google Gemini AI", "gemini-1.5-flash",
+                    gemini_client.agenerate, gemini_client.astream)
+
+
+# Global instance; order is the default preference. Providers are built on first use.
+provider_router = ProviderRouter(names=[
+    name.strip() for name in os.getenv("LLM_PROVIDERS", "gemini,ollama").split(",") if name.strip()
+])
@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import os
+import time
+from typing import Awaitable, Callable, Iterable, List, Set, Tuple
+
+from backend.cache import result_cache
+from backend.prompts import SECTION_SUMMARY_PROMPT, REDUCE_PROMPT
+from backend.retrieval import chunk_sections
+
+# Documents longer than this are summarized with map-reduce instead of one call
+SUMMARY_SINGLE_CALL_CHARS = int(os.getenv("SUMMARY_SINGLE_CALL_CHARS", "24000"))
+# Adjacent sections are packed into map batches of up to this many characters
+SUMMARY_MAP_CHARS = int(os.getenv("SUMMARY_MAP_CHARS", "12000"))
+SUMMARY_MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "8"))
+# Partial summaries are condensed again until they fit in the reduce prompt
+SUMMARY_REDUCE_CHARS = int(os.getenv("SUMMARY_REDUCE_CHARS", "16000"))
+
+MAP_OPTIONS = {"temperature": 0.2, "num_predict": 256}
+MAP_MODEL_TAG = "section-summary"
+
+# Returns (text, model tag of the provider that actually answered)
+Generate = Callable[..., Awaitable[Tuple[str, str]]]
+
+
+def needs_map_reduce(text: str) -> bool:
+    return len(text) > SUMMARY_SINGLE_CALL_CHARS
+
+
+def _ends_batch(block: str, max_chars: int) -> bool:
+    # Content-defined cut, more likely after longer blocks; batches average
+    # about half of max_chars before the size cap applies
+    draw = int(hashlib.sha256(block.encode("utf-8")).hexdigest()[:8], 16) / 0x100000000
+    return draw < 2 * len(block) / max_chars
+
+
+def pack_batches(parts: List[Tuple[str, str]], max_chars: int = SUMMARY_MAP_CHARS) -> List[str]:
+    """Group consecutive (heading, body) parts into prompt-sized batches.
+
+    Batches end where a block's own hash says so (or at max_chars), not at
+    a running length, so editing or inserting a section only changes the
+    batches around it and every other batch keeps its cached summary.
+    """
+    batches: List[str] = []
+    buf: List[str] = []
+    size = 0
+    for title, body in chunk_sections(parts, max_chars):
+        block = f"[{title}]\n{body}"
+        if buf and size + len(block) > max_chars:
+            batches.append("\n\n".join(buf))
+            buf, size = [], 0
+        buf.append(block)
+        size += len(block) + 2
+        if _ends_batch(block, max_chars):
+            batches.append("\n\n".join(buf))
+            buf, size = [], 0
+    if buf:
+        batches.append("\n\n".join(buf))
+    return batches
+
+
+async def _gather(aws: Iterable[Awaitable]) -> list:
+    """asyncio.gather that cancels the remaining calls once one fails"""
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return list(await asyncio.gather(*tasks))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _summarize_batch(batch: str, generate: Generate, limit: asyncio.Semaphore,
+                           model: str) -> Tuple[str, str]:
+    """(summary, model tag that produced it) for one batch"""
+    # Section summaries are cached on their own so unchanged sections are
+    # reused across requests and document revisions
+    key = result_cache.make_key(MAP_MODEL_TAG, batch, None, MAP_OPTIONS, model)
+    cached = await result_cache.get(key)
+    if cached is not None:
+        return cached, model
+    async with limit:
+        started = time.perf_counter()
+        out, served_by = await generate(SECTION_SUMMARY_PROMPT.format(content=batch), options=MAP_OPTIONS)
+    # The key names the preferred model; a fallback's summary is used but not stored under it
+    if served_by == model:
+        await result_cache.set(key, out, cost_seconds=time.perf_counter() - started)
+    return out, served_by
+
+
+async def map_sections(sections: List[Tuple[str, str]], generate: Generate,
+                       model: str) -> Tuple[List[str], Set[str]]:
+    """Summarize sections in parallel, condensing until the partials fit one reduce prompt.
+
+    Also returns the model tags that produced the partials.
+    """
+    limit = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
+    batches = pack_batches(sections)
+    served: Set[str] = set()
+    while True:
+        results = await _gather(_summarize_batch(b, generate, limit, model) for b in batches)
+        partials = [out for out, _ in results]
+        served.update(tag for _, tag in results)
+        if len(batches) <= 1 or sum(len(p) for p in partials) <= SUMMARY_REDUCE_CHARS:
+            return partials, served
+        condensed = pack_batches([(f"Part {i + 1}", p) for i, p in enumerate(partials)])
+        if len(condensed) >= len(batches):
+            return partials, served
+        batches = condensed
+
+
+def reduce_prompt(partials: List[str]) -> str:
+    return REDUCE_PROMPT.format(content="\n\n".join(partials))
+
+
+async def summarize_sections(sections: List[Tuple[str, str]], generate: Generate,
+                             model: str) -> Tuple[List[str], Set[str]]:
+    """One summary per section (plus the model tags that produced them);
+    oversized sections are summarized in parts.
+
+    Each section is cached as its own batch, so a section summarized for one
+    revision of a document is free for the next. These entries only match
+    map_sections' batches when a batch holds a single section.
+    """
+    limit = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
+    served: Set[str] = set()
+
+    async def one(section: Tuple[str, str]) -> str:
+        parts = await _gather(_summarize_batch(b, generate, limit, model) for b in pack_batches([section]))
+        served.update(tag for _, tag in parts)
+        return "\n".join(out for out, _ in parts)
+
+    return await _gather(one(s) for s in sections), served
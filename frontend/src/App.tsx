@@ -10,7 +10,7 @@ import GoogleAI from "./components/GoogleAI";
 import { ping, API, enhanceSummary, riskAnalysis, translateHindi } from "./api";
 
 export default function App() {
-  const [text, setText] = React.useState("");
+  const [docId, setDocId] = React.useState("");
   const [sections, setSections] = React.useState<[string, string][]>([]);
   const [risks, setRisks] = React.useState<[string, number][]>([]);
   const [summary, setSummary] = React.useState("");
@@ -31,7 +31,7 @@ export default function App() {
   }, []);
 
   const onLoaded = (payload: any) => {
-    setText(payload.text || "");
+    setDocId(payload.doc_id || "");
     setSections(payload.sections || []);
     setRisks(payload.risks || []);
   };
@@ -45,15 +45,15 @@ export default function App() {
         
         <UploadZone onLoaded={onLoaded} />
 
-        {text && (
+        {docId && (
           <motion.div
             initial={{ opacity: 0, y: 20 }}
             animate={{ opacity: 1, y: 0 }}
             transition={{ duration: 0.5 }}
           >
             <div className="results-grid">
-              <SummarySection text={text} risks={risks} onSummaryChange={setSummary} />
-              <QASection docText={text} />
+              <SummarySection doc={{ doc_id: docId }} risks={risks} onSummaryChange={setSummary} />
+              <QASection doc={{ doc_id: docId }} />
             </div>
             
             <div style={{ marginTop: '2rem' }}>
@@ -62,7 +62,7 @@ export default function App() {
 
             <div style={{ marginTop: '2rem' }}>
               <GoogleAI 
-                text={text} 
+                docId={docId}
                 summary={summary}
                 enhanceSummary={enhanceSummary}
                 riskAnalysis={riskAnalysis}
@@ -2,6 +2,13 @@ export const API = (typeof import.meta !== "undefined" && (import.meta as any).e
   || (typeof window !== "undefined" ? window.localStorage.getItem("API_BASE") || "" : "")
   || "http://localhost:8000";
 
+// A document is either inline text or the doc_id returned by /upload
+export type DocRef = string | { doc_id: string };
+
+function docBody(doc: DocRef){
+  return typeof doc === "string" ? { text: doc } : { doc_id: doc.doc_id };
+}
+
 async function handleResponse(r: Response){
   if(r.ok){
     return r.json();
@@ -29,11 +36,13 @@ export async function ping(){
   }
 }
 
-export async function uploadFile(file: File){
+// Pass the doc_id of an earlier version to get a section-level `revision` diff back
+export async function uploadFile(file: File, previousDocId?: string){
   const fd = new FormData();
   fd.append("file", file);
+  const previous = previousDocId ? `&previous_doc_id=${encodeURIComponent(previousDocId)}` : "";
   try{
-    const r = await fetch(`${API}/upload`, { method:"POST", body: fd });
+    const r = await fetch(`${API}/upload?include_text=false${previous}`, { method:"POST", body: fd });
     return await handleResponse(r);
   }catch(ex:any){
     const hint = `Failed to reach API at ${API}. Make sure backend is running (uvicorn on :8000), CORS allows origin, and no firewall is blocking.`;
@@ -41,12 +50,12 @@ export async function uploadFile(file: File){
   }
 }
 
-export async function analyze(mode: "summarize"|"simplify"|"qa", text: string, question?: string){
+export async function analyze(mode: "summarize"|"simplify"|"qa", doc: DocRef, question?: string){
   try{
     const r = await fetch(`${API}/analyze`, {
       method:"POST",
       headers: { "Content-Type":"application/json" },
-      body: JSON.stringify({ mode, text, question })
+      body: JSON.stringify({ mode, ...docBody(doc), question })
     });
     return await handleResponse(r);
   }catch(ex:any){
@@ -54,6 +63,77 @@ export async function analyze(mode: "summarize"|"simplify"|"qa", text: string, q
   }
 }
 
+// Reads a text/event-stream response, calling onEvent for each event
+async function readEvents(r: Response, onEvent: (event: string, data: any) => void){
+  if(!r.ok || !r.body){
+    return handleResponse(r);
+  }
+  const reader = r.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = "";
+  while(true){
+    const { value, done } = await reader.read();
+    if(done) break;
+    buf += decoder.decode(value, { stream: true });
+    let sep;
+    while((sep = buf.indexOf("\n\n")) !== -1){
+      const raw = buf.slice(0, sep);
+      buf = buf.slice(sep + 2);
+      const event = raw.match(/^event: (.*)$/m)?.[1] || "message";
+      onEvent(event, JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || "{}"));
+    }
+  }
+}
+
+// Streams /analyze output as server-sent events; abort the signal to cancel generation
+export async function analyzeStream(
+  mode: "summarize"|"simplify"|"qa",
+  doc: DocRef,
+  onDelta: (delta: string) => void,
+  question?: string,
+  signal?: AbortSignal
+){
+  const r = await fetch(`${API}/analyze/stream`, {
+    method:"POST",
+    headers: { "Content-Type":"application/json" },
+    body: JSON.stringify({ mode, ...docBody(doc), question }),
+    signal
+  });
+  let done: any = null;
+  await readEvents(r, (event, data) => {
+    if(event === "delta") onDelta(data.text);
+    else if(event === "error") throw new Error(data.detail || "Analyze failed");
+    else if(event === "done") done = data;
+  });
+  return done;
+}
+
+export type BatchTask = {
+  mode: "summarize"|"simplify"|"qa"|"enhance-summary"|"risk-analysis"|"translate-hindi";
+  id?: string;
+  question?: string;
+  text?: string;
+};
+
+// Runs several analyses over one document; onResult fires as each task finishes.
+// The backend caps tasks per request (BATCH_MAX_TASKS, default 16).
+export async function analyzeBatch(
+  doc: DocRef,
+  tasks: BatchTask[],
+  onResult: (result: { id: string; mode: string; result?: string; detail?: string }) => void,
+  signal?: AbortSignal
+){
+  const r = await fetch(`${API}/analyze/batch`, {
+    method:"POST",
+    headers: { "Content-Type":"application/json" },
+    body: JSON.stringify({ ...docBody(doc), tasks }),
+    signal
+  });
+  await readEvents(r, (event, data) => {
+    if(event === "result" || event === "error") onResult(data);
+  });
+}
+
 export async function enhanceSummary(text: string) {
   try {
     const r = await fetch(`${API}/enhance-summary`, {
@@ -67,12 +147,26 @@ export async function enhanceSummary(text: string) {
   }
 }
 
-export async function riskAnalysis(text: string) {
+// Summaries and risk hits for the sections that changed between two uploads
+export async function analyzeRevision(docId: string, previousDocId: string) {
+  try {
+    const r = await fetch(`${API}/analyze/revision`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ doc_id: docId, previous_doc_id: previousDocId })
+    });
+    return await handleResponse(r);
+  } catch (ex: any) {
+    throw new Error(`${ex?.message || "Revision analysis failed"}`);
+  }
+}
+
+export async function riskAnalysis(doc: DocRef) {
   try {
     const r = await fetch(`${API}/risk-analysis`, {
       method: "POST", 
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ text })
+      body: JSON.stringify(docBody(doc))
     });
     return await handleResponse(r);
   } catch (ex: any) {
@@ -80,12 +174,12 @@ export async function riskAnalysis(text: string) {
   }
 }
 
-export async function translateHindi(text: string) {
+export async function translateHindi(doc: DocRef) {
   try {
     const r = await fetch(`${API}/translate-hindi`, {
       method: "POST",
       headers: { "Content-Type": "application/json" }, 
-      body: JSON.stringify({ text })
+      body: JSON.stringify(docBody(doc))
     });
     return await handleResponse(r);
   } catch (ex: any) {
@@ -2,11 +2,11 @@ import React, { useState } from 'react';
 import { Sparkles, Shield, Languages, Loader2 } from 'lucide-react';
 
 interface GoogleAIProps {
-  text: string;
+  docId: string;
   summary: string;
 }
 
-export default function GoogleAI({ text, summary }: GoogleAIProps) {
+export default function GoogleAI({ docId, summary }: GoogleAIProps) {
   const [enhanced, setEnhanced] = useState("");
   const [risks, setRisks] = useState("");
   const [hindi, setHindi] = useState("");
@@ -20,7 +20,7 @@ export default function GoogleAI({ text, summary }: GoogleAIProps) {
       const response = await fetch(`http://localhost:8000/${endpoint}`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ text: endpoint === 'enhance-summary' ? summary : text })
+        body: JSON.stringify(endpoint === 'enhance-summary' ? { text: summary } : { doc_id: docId })
       });
       
       const data = await response.json();
@@ -86,7 +86,7 @@ export default function GoogleAI({ text, summary }: GoogleAIProps) {
         <button
           className="btn btn-primary btn-sm"
           onClick={() => callGoogleAPI('risk-analysis', setRisks, 'risk')}
-          disabled={loading === 'risk' || !text}
+          disabled={loading === 'risk' || !docId}
         >
           {loading === 'risk' ? (
             <><Loader2 className="spinner" size={16} />Analyzing...</>
@@ -98,7 +98,7 @@ export default function GoogleAI({ text, summary }: GoogleAIProps) {
         <button
           className="btn btn-primary btn-sm"
           onClick={() => callGoogleAPI('translate-hindi', setHindi, 'hindi')}
-          disabled={loading === 'hindi' || !text}
+          disabled={loading === 'hindi' || !docId}
         >
           {loading === 'hindi' ? (
             <><Loader2 className="spinner" size={16} />Translating...</>
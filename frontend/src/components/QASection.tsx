@@ -1,12 +1,12 @@
 import React, { useState } from 'react';
 import { MessageCircle, Send, Loader2 } from 'lucide-react';
-import { analyze } from '../api';
+import { analyze, DocRef } from '../api';
 
 interface QASectionProps {
-  docText: string;
+  doc: DocRef;
 }
 
-export default function QASection({ docText }: QASectionProps) {
+export default function QASection({ doc }: QASectionProps) {
   const [question, setQuestion] = useState("");
   const [answer, setAnswer] = useState("");
   const [loading, setLoading] = useState(false);
@@ -16,7 +16,7 @@ export default function QASection({ docText }: QASectionProps) {
     
     setLoading(true);
     try {
-      const { result } = await analyze("qa", docText, question);
+      const { result } = await analyze("qa", doc, question);
       setAnswer(result || "");
     } finally {
       setLoading(false);
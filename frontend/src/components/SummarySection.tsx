@@ -1,21 +1,21 @@
 import React, { useState } from 'react';
 import { FileText, Loader2, AlertCircle } from 'lucide-react';
-import { analyze } from '../api';
+import { analyzeStream, DocRef } from '../api';
 
 interface SummarySectionProps {
-  text: string;
+  doc: DocRef;
   risks: [string, number][];
 }
 
-export default function SummarySection({ text, risks }: SummarySectionProps) {
+export default function SummarySection({ doc, risks }: SummarySectionProps) {
   const [summary, setSummary] = useState("");
   const [loading, setLoading] = useState(false);
 
   const handleSummarize = async () => {
     setLoading(true);
     try {
-      const { result } = await analyze("summarize", text);
-      setSummary(result || "");
+      setSummary("");
+      await analyzeStream("summarize", doc, (delta) => setSummary((prev) => prev + delta));
     } finally {
       setLoading(false);
     }
@@ -31,7 +31,7 @@ export default function SummarySection({ text, risks }: SummarySectionProps) {
       <button
         className="btn btn-primary"
         onClick={handleSummarize}
-        disabled={loading || !text}
+        disabled={loading || !doc}
       >
         {loading ? (
           <>